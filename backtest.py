@@ -0,0 +1,199 @@
+'''
+BACKTEST
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Replays a season from a SeasonStore: predicts every player's points as
+     of each week t, and compares them to the points they really scored the
+     week after (points_7 on the sheet of week t + 1).
+  2) Reports the error of each prediction model (mean absolute error, root
+     mean squared error, bias), overall, per position and per week.
+  3) Reports the points lost each week by the lineup the optimizer would
+     have set from each model's predictions, against the best lineup in
+     hindsight.
+
+Predictions and errors are computed for the whole (weeks x players) array
+at once; only the lineups are solved one roster-week at a time.
+'''
+
+import numpy as np
+from lineupSolver import POSITION_BITS, solve_lineup
+from predictionModels import AverageModel, EwmaModel, RegressionModel
+
+
+DEFAULT_MODELS = {'average': AverageModel(), 'ewma': EwmaModel(), 'regression': RegressionModel()}
+
+
+# --------------------- BACKTEST RESULT OBJECT -----------------------
+class BacktestResult(object):
+    '''
+      DESCRIPTION:
+          The accuracy of each prediction model over a season.
+
+      ATTRIBUTES:
+          weeks: list of the week labels predicted from (the last week of
+                 the season has no following week to compare to)
+          errors: dict of model name -> dict with 'overall', 'position'
+                  (position -> metrics) and 'week' (week -> metrics), where
+                  metrics is a dict of count, mae, rmse and bias
+          lineups: dict of model name -> dict with 'chosen', 'hindsight' and
+                   'lost', numpy arrays of realized lineup points, one per
+                   roster-week
+
+      FUNCTIONS:
+          __init__
+          summary
+          print_report
+    '''
+
+    def __init__(self, weeks, errors, lineups):
+        self.weeks = weeks
+        self.errors = errors
+        self.lineups = lineups
+
+    def summary(self):
+        '''
+            @return: dict of model name -> overall error metrics, plus the
+                     mean realized points of the chosen lineups and the mean
+                     points lost per roster-week
+        '''
+        result = {}
+        for name, errors in self.errors.items():
+            result[name] = dict(errors['overall'])
+            if name in self.lineups:
+                lineups = self.lineups[name]
+                result[name]['lineup_pts'] = round(float(lineups['chosen'].mean()), 2)
+                result[name]['lineup_pts_lost'] = round(float(lineups['lost'].mean()), 2)
+        return result
+
+    def print_report(self):
+        print("\nBacktest over {} weeks:".format(len(self.weeks)))
+        print('{:12} {:>8} {:>8} {:>8} {:>8} {:>12} {:>16}'.format(
+                "model", "count", "mae", "rmse", "bias", "lineup_pts", "lineup_pts_lost"))
+        for name, s in self.summary().items():
+            print('{:12} {:>8} {:>8} {:>8} {:>8} {:>12} {:>16}'.format(
+                    name, s['count'], s['mae'], s['rmse'], s['bias'],
+                    s.get('lineup_pts', ''), s.get('lineup_pts_lost', '')))
+
+        print("\nMean absolute error by position:")
+        positions = sorted(set(p for e in self.errors.values() for p in e['position']),
+                           key=list(POSITION_BITS.keys()).index)
+        print('{:12} '.format("model") + ' '.join('{:>8}'.format(p) for p in positions))
+        for name, errors in self.errors.items():
+            print('{:12} '.format(name) + ' '.join(
+                    '{:>8}'.format(errors['position'].get(p, {}).get('mae', '')) for p in positions))
+
+
+
+def backtest(store, models=None, rosters=None, slots=None, lineups=True):
+    '''
+        Backtest prediction models over every week of a season.
+
+        @param: store, a SeasonStore
+                models, none (DEFAULT_MODELS) or a dict of name ->
+                        PredictionModel
+                rosters, none if each week's sheet is one roster, or an int
+                         array of shape (weeks, store players) with the
+                         roster of each player each week (-1 for none)
+                slots, none (the Team's STARTING_SLOTS), a RosterTemplate or a
+                       list of slot names
+                lineups, False to skip the lineup comparison
+        @return: BacktestResult
+    '''
+    from teamBuilder import STARTING_SLOTS
+    models = DEFAULT_MODELS if models is None else models
+    slots = STARTING_SLOTS if slots is None else slots
+    n_weeks = len(store.weeks)
+    assert n_weeks >= 2, "a backtest needs at least two weeks"
+
+    # Week t is compared to the points scored before the sheet of week t + 1
+    present = store.get_present()
+    compared = present[:-1] & present[1:]
+    realized = store.get_history('points_7')[1:]
+    positions = store.position_1[:n_weeks - 1, :len(store.names)]
+    if rosters is None:
+        rosters = np.where(present, 0, -1)
+
+    if lineups:
+        groups, masks = _roster_weeks(store, compared, rosters[:-1])
+        hindsight = _lineup_points(groups, masks, realized, realized, slots)
+
+    errors = {}
+    chosen_lineups = {}
+    for name, model in models.items():
+        predicted = model.predict_weeks(store)[:-1]
+        errors[name] = _error_metrics(predicted - realized, compared, positions, store.weeks[:-1])
+        if lineups:
+            chosen = _lineup_points(groups, masks, predicted, realized, slots)
+            chosen_lineups[name] = {'chosen': chosen, 'hindsight': hindsight,
+                                    'lost': np.round(hindsight - chosen, 2)}
+    return BacktestResult(list(store.weeks[:-1]), errors, chosen_lineups)
+
+
+def _error_metrics(error, compared, positions, weeks):
+    '''
+        Error metrics overall, by position and by week, each from masked
+        sums over the whole (weeks x players) array.
+    '''
+    from seasonStore import POSITION_CODES
+
+    def metrics(count, absolute, squared, total):
+        count = int(count)
+        if count == 0:
+            return {'count': 0, 'mae': None, 'rmse': None, 'bias': None}
+        return {'count': count, 'mae': round(float(absolute / count), 3),
+                'rmse': round(float(np.sqrt(squared / count)), 3),
+                'bias': round(float(total / count), 3)}
+
+    error = np.where(compared, error, 0.0)
+    absolute = np.abs(error)
+    squared = error**2
+
+    result = {'overall': metrics(compared.sum(), absolute.sum(), squared.sum(), error.sum())}
+
+    codes = positions[compared]
+    n_codes = len(POSITION_CODES)
+    by_position = [np.bincount(codes, weights=values[compared], minlength=n_codes)
+                   for values in (np.ones(error.shape), absolute, squared, error)]
+    result['position'] = {POSITION_CODES[c]: metrics(*(column[c] for column in by_position))
+                          for c in range(1, n_codes) if by_position[0][c] > 0}
+
+    by_week = [values.sum(axis=1) for values in (compared, absolute, squared, error)]
+    result['week'] = {week: metrics(*(column[t] for column in by_week))
+                      for t, week in enumerate(weeks)}
+    return result
+
+
+def _roster_weeks(store, compared, rosters):
+    '''
+        The players of every roster of every week, and everyone's position
+        bitmasks each week.
+
+        @return: (groups, masks), where groups is a list of (week index,
+                 player columns) and masks is an int array of shape (weeks,
+                 store players)
+    '''
+    from seasonStore import POSITION_CODES
+    bits = np.array([POSITION_BITS.get(code, 0) for code in POSITION_CODES], dtype=np.int64)
+    n_weeks, n_players = compared.shape
+    masks = (bits[store.position_1[:n_weeks, :n_players]] |
+             bits[store.position_2[:n_weeks, :n_players]])
+
+    groups = []
+    for t in range(n_weeks):
+        for roster in np.unique(rosters[t][rosters[t] >= 0]):
+            groups.append((t, np.flatnonzero((rosters[t] == roster) & compared[t])))
+    return groups, masks
+
+
+def _lineup_points(groups, masks, weights, realized, slots):
+    '''
+        Realized points of the lineup chosen by weights, for every roster
+        of every week. With weights = realized, it is the best lineup in
+        hindsight.
+    '''
+    points = np.zeros(len(groups))
+    for i, (t, players) in enumerate(groups):
+        pick = solve_lineup(weights[t, players], masks[t, players], slots)
+        points[i] = realized[t, players[pick[pick >= 0]]].sum()
+    return np.round(points, 2)
@@ -0,0 +1,307 @@
+'''
+BENCHMARK
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Generates synthetic player data in the Excel sheet schema (name,
+     position_1, position_2, team, points_7, games_7, points_total,
+     games_total, games_this_week), at any number of players.
+  2) Writes it to a workbook with one sheet per size, so the whole path
+     from Excel to a Team is timed.
+  3) Times create_team (first parse and cached), predict_team_next_points,
+     set_optimal_starting_roster and set_random_starting_roster at sizes
+     from 20 to 50,000 players, and measures their peak memory.
+  4) Times the cold start of a new Python process: importing teamBuilder,
+     and a whole cli.py optimize run on a cached sheet, against a target.
+  5) Appends each run to a JSON results file, labelled with the git
+     version, and prints the change against the previous run.
+
+Usage:
+  python benchmark.py [--sizes 20 1000 50000] [--repeat 3]
+                      [--results bench_results.json]
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tracemalloc
+import subprocess
+import numpy as np
+
+
+SIZES = [20, 100, 1000, 10000, 50000]
+FUNCTIONS = ['create_team (parse)', 'create_team (cached)', 'predict_team_next_points',
+             'set_optimal_starting_roster', 'set_random_starting_roster',
+             'cold_start (import)', 'cold_start (cli optimize)']
+COLD_START_TARGET = 0.5 # seconds, for a short batch job on a cached sheet
+RESULTS_FILE = 'bench_results.json'
+WORKBOOK_FILE = os.path.join('.bench_data', 'SyntheticTeams.xlsx')
+
+# Share of each primary position, and of forwards with a second position
+POSITION_SHARE = {'C': 0.2, 'L': 0.17, 'R': 0.17, 'D': 0.33, 'G': 0.13}
+DUAL_POSITION_SHARE = 0.3
+NHL_TEAMS = ['ANA', 'BOS', 'BUF', 'CAR', 'CBJ', 'CGY', 'CHI', 'COL', 'DAL', 'DET',
+             'EDM', 'FLA', 'LAK', 'MIN', 'MTL', 'NJD', 'NSH', 'NYI', 'NYR', 'OTT',
+             'PHI', 'PIT', 'SEA', 'SJS', 'STL', 'TBL', 'TOR', 'VAN', 'VGK', 'WPG', 'WSH']
+
+
+def synthetic_columns(n, seed=0):
+    '''
+        Generate n players in the Excel sheet schema. Each player has an
+        underlying points per game rate, and their last week and season
+        totals are drawn around it.
+
+        @param: n, int number of players
+                seed, int seed for repeatable data
+        @return: dict of column name -> numpy array
+    '''
+    rng = np.random.default_rng(seed)
+    positions = list(POSITION_SHARE.keys())
+    position_1 = rng.choice(positions, size=n, p=list(POSITION_SHARE.values()))
+
+    forward = np.isin(position_1, ['C', 'L', 'R'])
+    position_2 = np.full(n, '', dtype=object)
+    dual = forward & (rng.random(n) < DUAL_POSITION_SHARE)
+    other = rng.choice(['C', 'L', 'R'], size=n)
+    dual &= other != position_1
+    position_2[dual] = other[dual]
+
+    rate = rng.gamma(4.0, 0.6, size=n) # season ppg, mean around 2.4
+    games_total = rng.integers(5, 30, size=n)
+    games_7 = np.minimum(rng.integers(0, 5, size=n), games_total)
+    points_total = np.round(rng.normal(rate * games_total, 2.0 * np.sqrt(games_total)), 1)
+    points_7 = np.round(np.maximum(rng.normal(rate * games_7, 2.5 * np.sqrt(games_7)), 0), 1)
+
+    return {'name': np.array(['Player{:05d}'.format(i) for i in range(n)], dtype=object),
+            'position_1': position_1.astype(object),
+            'position_2': position_2,
+            'team': rng.choice(NHL_TEAMS, size=n).astype(object),
+            'points_7': points_7,
+            'games_7': games_7,
+            'points_total': points_total,
+            'games_total': games_total,
+            'games_this_week': rng.integers(0, 5, size=n)}
+
+
+def sheet_name(n):
+    return 'Synthetic{}'.format(n)
+
+
+def write_synthetic_workbook(path, sizes=SIZES, seed=0):
+    '''
+        Write one sheet of synthetic players per size. An existing workbook
+        that already has every sheet is reused, since writing 50,000 rows
+        of Excel takes a while.
+
+        @param: path, string path of the workbook to write
+                sizes, list of int numbers of players
+                seed, int seed for repeatable data
+        @return: path
+    '''
+    import pandas as pd
+    if os.path.exists(path):
+        with pd.ExcelFile(path) as book:
+            if all(sheet_name(n) in book.sheet_names for n in sizes):
+                return path
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with pd.ExcelWriter(path) as writer:
+        for n in sizes:
+            pd.DataFrame(synthetic_columns(n, seed)).to_excel(writer, sheet_name=sheet_name(n),
+                                                               index=False)
+    return path
+
+
+def time_call(function, repeat=3, setup=None):
+    '''
+        Time a function, and measure its peak memory in a separate call
+        (tracemalloc slows the code down, so it is not on while timing).
+
+        @param: function, a callable taking no arguments
+                repeat, int number of timed calls, the fastest is kept
+                setup, none or a callable run (untimed) before each call
+        @return: (seconds, peak_kb)
+    '''
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024.0
+
+
+def run_benchmarks(sizes=SIZES, repeat=3, workbook=WORKBOOK_FILE):
+    '''
+        Time every benchmarked function at every size.
+
+        @param: sizes, list of int numbers of players
+                repeat, int number of timed calls per function
+                workbook, string path of the synthetic workbook
+        @return: list of dicts with the size, function, seconds and peak_kb
+    '''
+    from teamBuilder import Team
+    write_synthetic_workbook(workbook, sizes)
+    cache = os.path.join(os.path.dirname(os.path.abspath(workbook)), '.sheet_cache')
+
+    def clear_cache():
+        shutil.rmtree(cache, ignore_errors=True)
+
+    results = []
+    for n in sizes:
+        sheet = sheet_name(n)
+        team = Team(workbook, sheet)
+        calls = [('create_team (parse)', lambda: Team(workbook, sheet), clear_cache, 1),
+                 ('create_team (cached)', lambda: Team(workbook, sheet), None, repeat),
+                 ('predict_team_next_points', team.predict_team_next_points, None, repeat),
+                 ('set_optimal_starting_roster', team.set_optimal_starting_roster, None, repeat),
+                 ('set_random_starting_roster', team.set_random_starting_roster, None, repeat)]
+        for name, function, setup, times in calls:
+            seconds, peak_kb = time_call(function, times, setup)
+            results.append({'size': n, 'function': name,
+                            'seconds': round(seconds, 6), 'peak_kb': round(peak_kb, 1)})
+
+    # Memory of a new process is not measured, only its time
+    for result in time_cold_start(workbook, sheet_name(sizes[0]), repeat):
+        result.update({'size': sizes[0], 'peak_kb': None})
+        results.append(result)
+    return results
+
+
+def time_cold_start(workbook, sheet, repeat=3):
+    '''
+        Time new Python processes, so the imports are included. The sheet
+        is read once first, so the cli run reads it from the sheet cache.
+
+        @param: workbook, string path of the workbook
+                sheet, string name of the sheet the cli optimizes
+                repeat, int number of runs, the fastest is kept
+        @return: list of dicts with the function, seconds and heavy_modules
+                 (pandas or matplotlib, if the process imported them)
+    '''
+    from sheetCache import read_sheet
+    read_sheet(workbook, sheet)
+    folder = os.path.dirname(os.path.abspath(__file__))
+    check = "; import sys; print('heavy:' + ','.join(m for m in ('pandas', 'matplotlib') if m in sys.modules))"
+    runs = [('cold_start (import)', [sys.executable, '-c', 'import teamBuilder' + check]),
+            ('cold_start (cli optimize)',
+             [sys.executable, '-c', "import sys; sys.argv = ['cli.py', 'optimize', {!r}, {!r}, '--json']; "
+              "import cli; cli.main(sys.argv[1:])".format(os.path.abspath(workbook), sheet) + check])]
+
+    results = []
+    for name, command in runs:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.check_output(command, cwd=folder)
+            best = min(best, time.perf_counter() - start)
+        heavy = output.decode().strip().splitlines()[-1][len('heavy:'):]
+        results.append({'function': name, 'seconds': round(best, 6),
+                        'heavy_modules': heavy.split(',') if heavy else []})
+    return results
+
+
+def git_version():
+    '''
+        @return: string short hash of the checked out commit (with '+' if
+                 there are uncommitted changes), or 'unknown'
+    '''
+    folder = os.path.dirname(os.path.abspath(__file__))
+    try:
+        version = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=folder,
+                                          stderr=subprocess.DEVNULL).decode().strip()
+        changed = subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                          cwd=folder, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return version + ('+' if changed else '')
+
+
+def save_results(results, path=RESULTS_FILE):
+    '''
+        Append a run to the results file.
+
+        @param: results, list returned by run_benchmarks
+                path, string path of the JSON results file
+        @return: list of all stored runs, oldest first
+    '''
+    runs = load_results(path)
+    runs.append({'version': git_version(),
+                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+                 'python': platform.python_version(),
+                 'numpy': np.__version__,
+                 'results': results})
+    with open(path, 'w') as f:
+        json.dump(runs, f, indent=1)
+    return runs
+
+
+def load_results(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def print_results(results, previous=None):
+    '''
+        Print a table of results, with the time relative to a previous run
+        of the same size and function where there is one.
+
+        @param: results, list returned by run_benchmarks
+                previous, none or a stored run from load_results
+    '''
+    before = {}
+    if previous is not None:
+        before = {(r['size'], r['function']): r['seconds'] for r in previous['results']}
+        print("\nCompared to version {} ({})".format(previous['version'], previous['timestamp']))
+
+    print('\n{:>7} {:30} {:>12} {:>12} {:>10}'.format("players", "function", "seconds",
+                                                      "peak_kb", "vs_before"))
+    for r in results:
+        old = before.get((r['size'], r['function']))
+        change = '{:.2f}x'.format(r['seconds'] / old) if old else ''
+        peak = '-' if r['peak_kb'] is None else '{:.1f}'.format(r['peak_kb'])
+        print('{:>7} {:30} {:>12.6f} {:>12} {:>10}'.format(r['size'], r['function'],
+                                                           r['seconds'], peak, change))
+
+    cold = [r for r in results if r['function'].startswith('cold_start')]
+    for r in cold:
+        status = 'ok' if r['seconds'] <= COLD_START_TARGET else 'OVER TARGET'
+        heavy = ', '.join(r['heavy_modules']) or 'none'
+        print("{}: {:.3f}s (target {}s) {}, heavy modules imported: {}".format(
+                r['function'], r['seconds'], COLD_START_TARGET, status, heavy))
+
+
+
+# --------------- MAIN FUNCTION ------------------
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the FantasyTeamBuilder hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workbook', default=WORKBOOK_FILE)
+    parser.add_argument('--results', default=RESULTS_FILE)
+    parser.add_argument('--no-save', action='store_true', help="do not store this run")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    results = run_benchmarks(args.sizes, args.repeat, args.workbook)
+    runs = load_results(args.results)
+    print_results(results, runs[-1] if runs else None)
+    if not args.no_save:
+        save_results(results, args.results)
+        print("\nSaved to", args.results)
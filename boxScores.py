@@ -0,0 +1,318 @@
+'''
+BOX SCORES
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Streams raw per-game stat CSVs (G, A, GP, S, BLK, +/-, GA, SV, W, SO,
+     ...) in chunks, so files of any size are read in constant memory.
+  2) Scores every game with a league's scoring schema. The schema is a
+     (2 x stats) weight matrix, one row for skaters and one for goalies,
+     applied to each chunk as a single matrix product.
+  3) Aggregates fantasy points and games per player per week.
+  4) Gives the weekly totals in the sheet schema (points_7, games_7,
+     points_total, games_total, games_this_week), as a PlayerTable, a
+     Team or a whole SeasonStore.
+
+The CSV needs one row per player per game, with a 'date' column, a 'name'
+column, a 'position' column ('C', 'D', 'G', or two positions like 'C/R'),
+optionally a 'team' column, and a column for every stat of the schema.
+Stats missing from a row (ie. goalie stats of a skater) count as 0. A 'GP'
+column, if there is one, gives the games played by the row; otherwise
+each row is one game.
+
+Weeks run Monday to Sunday. The data of the week starting on Monday D goes
+into the sheet as of the next Monday, D + 7, like the hand-entered sheets:
+ie. games from Nov 26 to Dec 2 are the points_7 of 'Dec03Data'.
+'''
+
+import datetime
+import numpy as np
+
+
+# Stat columns of the CSV -> fantasy points per unit, by player type
+DEFAULT_SKATER_SCORING = {'G': 3.0, 'A': 2.0, '+/-': 1.0, 'S': 0.5, 'BLK': 0.5}
+DEFAULT_GOALIE_SCORING = {'W': 5.0, 'GA': -3.0, 'SV': 0.6, 'SO': 5.0}
+
+WEEK_LABEL = '%b%dData' # ie. 'Dec03Data', the sheet names of the workbook
+DEFAULT_CHUNK_SIZE = 100000
+
+
+# --------------------- SCORING SCHEMA OBJECT ------------------------
+class ScoringSchema(object):
+    '''
+      DESCRIPTION:
+          A league's fantasy points per unit of each stat, for skaters and
+          goalies.
+
+      ATTRIBUTES:
+          stats: list of every stat column scored, for either player type
+          weights: float array of shape (2, stats), row 0 for skaters and
+                   row 1 for goalies
+
+      FUNCTIONS:
+          __init__
+          score
+    '''
+
+    def __init__(self, skaters=None, goalies=None):
+        '''
+            @param: skaters, dict of stat column -> points (default
+                             DEFAULT_SKATER_SCORING)
+                    goalies, dict of stat column -> points (default
+                             DEFAULT_GOALIE_SCORING)
+        '''
+        skaters = DEFAULT_SKATER_SCORING if skaters is None else skaters
+        goalies = DEFAULT_GOALIE_SCORING if goalies is None else goalies
+        self.stats = list(skaters.keys()) + [s for s in goalies.keys() if s not in skaters]
+        self.weights = np.array([[skaters.get(s, 0.0) for s in self.stats],
+                                 [goalies.get(s, 0.0) for s in self.stats]])
+
+    def score(self, values, is_goalie):
+        '''
+            Fantasy points of many stat lines at once.
+
+            @param: values, float array of shape (lines, stats), in the order
+                            of self.stats
+                    is_goalie, bool array, one per line
+            @return: numpy float array of points, one per line
+        '''
+        points = values @ self.weights.T # (lines, 2): as a skater, as a goalie
+        return points[np.arange(len(points)), is_goalie.astype(int)]
+
+
+
+# ------------------- BOX SCORE AGGREGATE OBJECT ---------------------
+class BoxScoreAggregate(object):
+    '''
+      DESCRIPTION:
+          Running totals of fantasy points and games per player per week,
+          built up one chunk of box scores at a time. Only these totals
+          are kept, never the box scores themselves.
+
+      ATTRIBUTES:
+          schema: the ScoringSchema used
+          names: list of player names, one per player column
+          week_starts: list of the Monday dates of the weeks seen, in the
+                       order first seen (see get_weeks for season order)
+          points, games: arrays of shape (week capacity, player capacity)
+          position_1, position_2, team: lists of each player's latest
+                                        positions and NHL team
+          lines: number of box score lines read
+
+      FUNCTIONS:
+          __init__
+          add_chunk
+          get_weeks
+          get_columns
+          get_table
+          get_team
+          to_season_store
+    '''
+
+    def __init__(self, schema=None):
+        self.schema = ScoringSchema() if schema is None else schema
+        self.names = []
+        self.week_starts = []
+        self.position_1 = []
+        self.position_2 = []
+        self.team = []
+        self.lines = 0
+        self._player_index = {}
+        self._week_index = {}
+        self.points = np.zeros((8, 64))
+        self.games = np.zeros((8, 64), dtype=np.int64)
+
+
+    def add_chunk(self, frame):
+        '''
+            Score and add one chunk of box score lines.
+
+            @param: frame, a pandas DataFrame of box score lines
+            @return: none
+        '''
+        missing = [s for s in self.schema.stats if s not in frame.columns]
+        assert not missing, "box scores are missing the stat columns {}".format(missing)
+        if len(frame) == 0:
+            return
+
+        values = frame[self.schema.stats].to_numpy(dtype=float, na_value=0.0)
+        positions = frame['position'].fillna('').astype(str).to_numpy()
+        is_goalie = np.char.find(positions.astype(str), 'G') >= 0
+        points = self.schema.score(values, is_goalie)
+        if 'GP' in frame.columns:
+            games = frame['GP'].fillna(0).to_numpy(dtype=np.int64)
+        else:
+            games = np.ones(len(frame), dtype=np.int64)
+
+        # Map the chunk's players and weeks to columns and rows, once each
+        names, name_of_line = np.unique(frame['name'].astype(str).to_numpy(), return_inverse=True)
+        players = np.array([self._add_player(name) for name in names], dtype=int)[name_of_line]
+        mondays = _week_starts(frame['date'])
+        starts, start_of_line = np.unique(mondays, return_inverse=True)
+        weeks = np.array([self._add_week(start) for start in starts], dtype=int)[start_of_line]
+        self._allocate(len(self.week_starts), len(self.names))
+
+        np.add.at(self.points, (weeks, players), points)
+        np.add.at(self.games, (weeks, players), games)
+
+        # The last line of each player in the chunk sets their positions and team
+        last = len(name_of_line) - 1 - np.unique(name_of_line[::-1], return_index=True)[1]
+        teams = frame['team'].fillna('').astype(str).to_numpy() if 'team' in frame.columns else None
+        for line in last:
+            player = players[line]
+            split = positions[line].replace(',', '/').split('/')
+            self.position_1[player] = split[0].strip()
+            self.position_2[player] = split[1].strip() if len(split) > 1 else ''
+            if teams is not None:
+                self.team[player] = teams[line]
+        self.lines += len(frame)
+
+
+    def get_weeks(self):
+        '''
+            @return: list of sheet labels (see WEEK_LABEL) there is data for,
+                     in season order. Each is the Monday after a week of
+                     games.
+        '''
+        return [_label(start + datetime.timedelta(days=7)) for start in sorted(self.week_starts)]
+
+
+    def get_columns(self, week=-1, names=None, schedule=None):
+        '''
+            The sheet columns as of the start of a week: last week's and
+            season totals up to then, and the games of the week ahead.
+
+            @param: week, a label from get_weeks, or an int index into it
+                          (default the latest)
+                    names, none for every player seen so far, or a list of
+                           player names (ie. one fantasy team's roster)
+                    schedule, none or a dict of player name -> games this
+                              week. Without it, the games the player went on
+                              to play that week are used if they are in the
+                              box scores, otherwise 0.
+            @return: dict of sheet column name -> numpy array
+        '''
+        labels = self.get_weeks()
+        w = labels.index(week) if isinstance(week, str) else range(len(labels))[week]
+        order = np.argsort(self.week_starts) # rows in season order
+        n_players = len(self.names)
+        points = self.points[order, :n_players]
+        games = self.games[order, :n_players]
+
+        if names is None:
+            players = np.flatnonzero(games[:w + 1].sum(axis=0) > 0)
+        else:
+            players = np.array([self._player_index[str(name)] for name in names], dtype=int)
+
+        if schedule is not None:
+            this_week = np.array([schedule.get(self.names[p], 0) for p in players], dtype=np.int64)
+        elif w + 1 < len(order):
+            this_week = games[w + 1, players]
+        else:
+            this_week = np.zeros(len(players), dtype=np.int64)
+
+        return {'name': np.array([self.names[p] for p in players], dtype=object),
+                'position_1': np.array([self.position_1[p] for p in players], dtype=object),
+                'position_2': np.array([self.position_2[p] for p in players], dtype=object),
+                'team': np.array([self.team[p] for p in players], dtype=object),
+                'points_7': np.round(points[w, players], 2),
+                'games_7': games[w, players],
+                'points_total': np.round(points[:w + 1, players].sum(axis=0), 2),
+                'games_total': games[:w + 1, players].sum(axis=0),
+                'games_this_week': this_week}
+
+
+    def get_table(self, week=-1, names=None, schedule=None):
+        '''
+            @param: see get_columns
+            @return: PlayerTable as of that week
+        '''
+        from playerTable import PlayerTable
+        return PlayerTable(self.get_columns(week, names, schedule))
+
+
+    def get_team(self, week=-1, names=None, schedule=None):
+        '''
+            @param: see get_columns
+            @return: Team as of that week
+        '''
+        from teamBuilder import Team
+        return Team(table=self.get_table(week, names, schedule))
+
+
+    def to_season_store(self, names=None):
+        '''
+            @param: names, none for every player, or a list of player names
+            @return: SeasonStore with one week per label in get_weeks
+        '''
+        from seasonStore import SeasonStore
+        store = SeasonStore()
+        for week in self.get_weeks():
+            store.append_week(week, self.get_columns(week, names))
+        return store
+
+
+    def _add_player(self, name):
+        if name not in self._player_index:
+            self._player_index[name] = len(self.names)
+            self.names.append(name)
+            self.position_1.append('')
+            self.position_2.append('')
+            self.team.append('')
+        return self._player_index[name]
+
+
+    def _add_week(self, start):
+        if start not in self._week_index:
+            self._week_index[start] = len(self.week_starts)
+            self.week_starts.append(start)
+        return self._week_index[start]
+
+
+    def _allocate(self, n_weeks, n_players):
+        '''
+            Make sure the arrays have room for n_weeks x n_players, doubling
+            the capacity of whichever axis is too small.
+        '''
+        capacity = self.points.shape
+        if n_weeks <= capacity[0] and n_players <= capacity[1]:
+            return
+        shape = (max(n_weeks, 2 * capacity[0]) if n_weeks > capacity[0] else capacity[0],
+                 max(n_players, 2 * capacity[1]) if n_players > capacity[1] else capacity[1])
+        for attribute in ['points', 'games']:
+            old = getattr(self, attribute)
+            new = np.zeros(shape, dtype=old.dtype)
+            new[:capacity[0], :capacity[1]] = old
+            setattr(self, attribute, new)
+
+
+
+def read_box_scores(path, schema=None, chunk_size=DEFAULT_CHUNK_SIZE, **read_csv_args):
+    '''
+        Stream a box score CSV into weekly fantasy point totals.
+
+        @param: path, string path (or file object) of the CSV
+                schema, none (default scoring) or a ScoringSchema
+                chunk_size, int number of lines read at a time
+                read_csv_args, extra arguments to pandas.read_csv, ie. sep
+        @return: BoxScoreAggregate
+    '''
+    import pandas as pd
+    aggregate = BoxScoreAggregate(schema)
+    for chunk in pd.read_csv(path, chunksize=chunk_size, **read_csv_args):
+        aggregate.add_chunk(chunk)
+    return aggregate
+
+
+def _week_starts(dates):
+    '''
+        @param: dates, pandas Series of dates (strings or datetimes)
+        @return: numpy array of datetime.date, the Monday of each date's week
+    '''
+    import pandas as pd
+    days = pd.to_datetime(dates).dt.normalize()
+    return (days - pd.to_timedelta(days.dt.weekday, unit='D')).dt.date.to_numpy()
+
+
+def _label(day):
+    return day.strftime(WEEK_LABEL)
@@ -0,0 +1,190 @@
+'''
+CHART REPORT
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Gets the weekly history of a player's total points and points per
+     game from a SeasonStore, plus next week's prediction.
+  2) Draws a player's trend chart (used by Player.plot_player_stats).
+  3) Renders the charts of a whole roster (or league) to image files, with
+     no window: each process draws every chart on one reused figure, and
+     the players can be spread across a process pool. Reports the total
+     render time.
+
+Charts are drawn on matplotlib Figure objects directly rather than through
+pyplot, so rendering never needs a display and never changes the pyplot
+backend of the calling program. matplotlib is only imported when a chart
+is drawn.
+'''
+
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from predictionModels import points_per_game
+
+
+FIGURE_SIZE = (8, 6)
+DEFAULT_FORMAT = 'png'
+DEFAULT_DPI = 80
+
+
+def player_series(player, store=None):
+    '''
+        The points to chart for a player: one per week of the season, then
+        next week's prediction. Without a store (or if the player is not in
+        it), the weeks are before last week, last week and next week.
+
+        @param: player, a Player
+                store, none (the store given to the player's prediction
+                       model, if any) or a SeasonStore
+        @return: dict of name, labels (list of x labels), total_pts and ppg
+                 (lists of floats, one per label)
+    '''
+    store = player.table.model_store if store is None else store
+    column = -1
+    if store is not None:
+        column = int(store.get_player_columns([player.get_name()])[0])
+
+    predicted_pts = player.get_stats('predicted', 'pts')
+    if column < 0:
+        games_before = player.get_stats('total', 'games') - player.get_stats('last_week', 'games')
+        pts_before = player.get_stats('total', 'pts') - player.get_stats('last_week', 'pts')
+        return {'name': player.get_name(),
+                'labels': ['before', 'last week', 'upcoming week'],
+                'total_pts': [round(pts_before, 2), player.get_stats('total', 'pts'),
+                              round(player.get_stats('total', 'pts') + predicted_pts, 2)],
+                'ppg': [float(points_per_game(pts_before, games_before)),
+                        player.get_stats('last_week', 'ppg'),
+                        player.get_stats('predicted', 'ppg')]}
+
+    through = player.table.model_week if player.table.model_store is store else None
+    present = store.get_present(through)[:, column]
+    total = store.get_history('points_total', through)[present, column]
+    ppg = points_per_game(store.get_history('points_7', through)[present, column],
+                          store.get_history('games_7', through)[present, column])
+    weeks = [week for week, there in zip(store.weeks, present) if there]
+    last_total = float(total[-1]) if len(total) else 0.0
+    return {'name': player.get_name(),
+            'labels': weeks + ['next week'],
+            'total_pts': [float(x) for x in total] + [round(last_total + predicted_pts, 2)],
+            'ppg': [float(x) for x in ppg] + [player.get_stats('predicted', 'ppg')]}
+
+
+def draw_player_chart(figure, series):
+    '''
+        Draw a player's chart on a figure. The axes and lines are made the
+        first time a figure is used, after that only their data, labels
+        and limits are updated, which is most of the cost of a new chart.
+
+        @param: figure, a matplotlib Figure
+                series, dict from player_series
+        @return: none
+    '''
+    chart = getattr(figure, '_player_chart', None)
+    if chart is None:
+        chart = _setup_chart(figure)
+
+    chart['title'].set_text(series['name'])
+    x = np.arange(len(series['labels']))
+    rotation = 30 if len(x) > 6 else 0
+    for key, (axes, history, predicted) in chart['axes'].items():
+        values = series[key]
+        history.set_data(x[:-1], values[:-1])
+        predicted.set_data(x[-2:], values[-2:])
+        axes.set_xticks(x)
+        if key == 'ppg': # Week labels on the bottom chart only
+            axes.set_xticklabels(series['labels'], rotation=rotation, fontsize=8)
+        axes.set_xlim(-0.5, len(x) - 0.5)
+        axes.set_ylim(bottom=0, top=max(max(values) * 1.25, 1))
+
+
+def _setup_chart(figure):
+    '''
+        Make the axes and lines of a player chart on a figure.
+
+        @return: dict with the title and, for total_pts and ppg, the axes,
+                 the history line and the prediction line
+    '''
+    figure.clear()
+    figure.subplots_adjust(left=0.1, right=0.95, top=0.9, bottom=0.14, hspace=0.15)
+    chart = {'title': figure.suptitle('', fontsize=16), 'axes': {}}
+    for position, key, colour, label in [(211, 'total_pts', 'r', 'Total Points'),
+                                         (212, 'ppg', 'b', 'Points Per Game')]:
+        axes = figure.add_subplot(position)
+        history, = axes.plot([], [], colour, marker='o', label=label.lower())
+        predicted, = axes.plot([], [], colour + '--', marker='o', label='predicted')
+        axes.set_ylabel(label)
+        if key == 'ppg':
+            axes.set_xlabel('Week')
+        else:
+            axes.tick_params(labelbottom=False)
+        chart['axes'][key] = (axes, history, predicted)
+    figure._player_chart = chart
+    return chart
+
+
+def render_player_charts(players, folder, store=None, processes=1, file_format=DEFAULT_FORMAT,
+                         dpi=DEFAULT_DPI):
+    '''
+        Render the chart of every player to an image file in a folder,
+        named after the player.
+
+        @param: players, a Team, or a list of Players
+                folder, string path of the folder to write to
+                store, none or a SeasonStore with the players' history (see
+                       player_series)
+                processes, int number of worker processes (1 renders in this
+                           process)
+                file_format, image file extension, ie. 'png', 'svg', 'pdf'
+                dpi, int resolution of raster images
+        @return: dict with the number of charts, the files written, the
+                 processes used, the total seconds and charts per second
+    '''
+    start = time.perf_counter()
+    players = getattr(players, 'player_list', players)
+    os.makedirs(folder, exist_ok=True)
+    jobs = [(player_series(p, store), os.path.join(folder, _file_name(p.get_name(), file_format)))
+            for p in players]
+
+    if processes == 1:
+        _init_worker(dpi)
+        files = _render_chunk(jobs)
+    else:
+        chunk_size = max(1, int(np.ceil(len(jobs) / (4 * processes))))
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(dpi,)) as pool:
+            files = [f for chunk in pool.map(_render_chunk, chunks) for f in chunk]
+
+    seconds = time.perf_counter() - start
+    return {'charts': len(files), 'files': files, 'processes': processes,
+            'seconds': round(seconds, 4),
+            'charts_per_second': round(len(files) / seconds, 1) if seconds else None}
+
+
+
+# Worker state, one reused figure per process
+_WORKER = {}
+
+
+def _init_worker(dpi):
+    from matplotlib.figure import Figure # No pyplot, so no display needed
+    _WORKER['figure'] = Figure(figsize=FIGURE_SIZE)
+    _WORKER['dpi'] = dpi
+
+
+def _render_chunk(jobs):
+    '''
+        @param: jobs, list of (series, file path)
+        @return: list of the file paths written
+    '''
+    figure = _WORKER['figure']
+    for series, path in jobs:
+        draw_player_chart(figure, series)
+        figure.savefig(path, dpi=_WORKER['dpi'])
+    return [path for _, path in jobs]
+
+
+def _file_name(name, file_format):
+    safe = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+    return '{}.{}'.format(safe, file_format)
@@ -0,0 +1,208 @@
+'''
+CLI
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Command line entry point for batch jobs, with four subcommands over
+     one sheet of a workbook:
+       - optimize: set the optimal starting roster and show its points
+       - stats: show the team's stats, or one player's
+       - predict: show next week's predicted points, with any model
+       - charts: render every player's trend chart to image files
+  2) Prints plain text, or JSON with --json.
+
+Nothing here opens a window, and pandas and matplotlib are only imported
+when they are needed (pandas when a sheet is not in the sheet cache yet),
+so a run on a cached sheet starts in the time it takes to import NumPy.
+
+Usage:
+  python cli.py optimize FantasyTeamPoints.xlsx Dec03Data [--top 3]
+  python cli.py stats FantasyTeamPoints.xlsx Dec03Data [--player Pionk]
+  python cli.py predict FantasyTeamPoints.xlsx Dec03Data [--model ewma]
+  python cli.py charts FantasyTeamPoints.xlsx Dec03Data [--out charts]
+'''
+
+import sys
+import json
+import argparse
+
+
+MODELS = ['average', 'ewma', 'regression']
+
+
+def load_team(path, sheet, model='average', history=False):
+    '''
+        Load a Team, with a prediction model. The models that use the
+        weekly history load every sheet of the workbook into a SeasonStore.
+
+        @param: path, string path to the Excel workbook
+                sheet, string name of the sheet
+                model, a string in MODELS
+                history, True to load the SeasonStore for any model
+        @return: Team
+    '''
+    from teamBuilder import Team
+    if model == 'average' and not history:
+        return Team(path, sheet)
+
+    from seasonStore import SeasonStore
+    store = SeasonStore.from_workbook(path)
+    return set_model(store.get_team(sheet), model, store, sheet)
+
+
+def set_model(team, model, store, sheet):
+    '''
+        Give a team the prediction model of that name. Shared with the
+        lineup service, so both predict the same way.
+
+        @param: team, a Team
+                model, a string in MODELS
+                store, the SeasonStore the team was loaded from
+                sheet, string name of the team's sheet
+        @return: the Team
+    '''
+    from predictionModels import AverageModel, EwmaModel, RegressionModel
+    models = {'average': AverageModel, 'ewma': EwmaModel, 'regression': RegressionModel}
+    team.set_prediction_model(models[model](), store, sheet)
+    return team
+
+
+def roster_names(roster):
+    return {position: [p.get_name() for p in players] for position, players in roster.items()}
+
+
+def player_summary(p):
+    return {'name': p.get_name(),
+            'position': p.get_position(),
+            'total_pts': p.get_stats('total', 'pts'),
+            'overall_ppg': p.get_stats('total', 'ppg'),
+            'last_wk_ppg': p.get_stats('last_week', 'ppg'),
+            'next_wk_games': p.get_stats('predicted', 'games'),
+            'next_wk_pts': p.get_stats('predicted', 'pts')}
+
+
+def predictions(team):
+    '''
+        @return: list of dicts with every player's predicted games and
+                 points, highest predicted points first
+    '''
+    order = team.table.sort_by('predicted', 'pts', team._get_rows(team.player_list))
+    by_row = {p.row: p for p in team.player_list}
+    return [{'name': by_row[row].get_name(),
+             'games': by_row[row].get_stats('predicted', 'games'),
+             'predicted_pts': by_row[row].get_prediction()} for row in order]
+
+
+def optimize(args):
+    '''
+        @return: dict with the starting roster, its predicted points, and the
+                 next best rosters if --top is more than 1
+    '''
+    team = load_team(args.workbook, args.sheet, args.model)
+    team.set_optimal_starting_roster()
+    result = {'sheet': args.sheet,
+              'predicted_points': team.predict_starting_roster_next_points(),
+              'starting_roster': roster_names(team.starting_roster)}
+    if args.top > 1:
+        result['top_rosters'] = [{'predicted_points': points, 'starting_roster': roster_names(roster)}
+                                 for points, roster in team.get_top_starting_rosters(args.top)]
+
+    if not args.json:
+        print("Starting Roster:")
+        team.print_starting_roster()
+        print("\nPredicted Roster Points: ", result['predicted_points'])
+        for i, other in enumerate(result.get('top_rosters', [])[1:]):
+            print("Next best roster {}: {}".format(i + 2, other['predicted_points']))
+    return result
+
+
+def stats(args):
+    '''
+        @return: dict with the stats of every player, or of --player
+    '''
+    team = load_team(args.workbook, args.sheet, args.model)
+    if args.player is not None:
+        p = team.get_player_by_name(args.player)
+        if p is None:
+            raise SystemExit("No player named {} on {}".format(args.player, args.sheet))
+        if not args.json:
+            p.print_player_info()
+        return player_summary(p)
+
+    if not args.json:
+        team.print_team_stats()
+    return {'sheet': args.sheet, 'players': [player_summary(p) for p in team.player_list]}
+
+
+def predict(args):
+    '''
+        @return: dict with every player's predicted points, highest first,
+                 and the whole team's total
+    '''
+    team = load_team(args.workbook, args.sheet, args.model)
+    players = predictions(team)
+    result = {'sheet': args.sheet, 'model': args.model,
+              'team_points': team.predict_team_next_points(), 'players': players}
+
+    if not args.json:
+        print('{:16} {:6} {:10}'.format("name", "games", "predicted"))
+        for p in players:
+            print('{:16} {:<6} {:<10}'.format(p['name'], p['games'], p['predicted_pts']))
+        print("\nPredicted Team Points: ", result['team_points'])
+    return result
+
+
+def charts(args):
+    '''
+        @return: dict with the files written and the render time
+    '''
+    from chartReport import render_player_charts
+    team = load_team(args.workbook, args.sheet, args.model, history=True)
+    result = render_player_charts(team, args.out, processes=args.processes,
+                                  file_format=args.format)
+    if not args.json:
+        print("Rendered {} charts to {} in {}s ({} charts per second)".format(
+                result['charts'], args.out, result['seconds'], result['charts_per_second']))
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py',
+                                     description='FantasyTeamBuilder command line tools.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, function, text in [('optimize', optimize, 'set the optimal starting roster'),
+                                 ('stats', stats, 'show team or player stats'),
+                                 ('predict', predict, "predict next week's points"),
+                                 ('charts', charts, "render every player's chart to a file")]:
+        command = commands.add_parser(name, help=text)
+        command.add_argument('workbook', help='path to the Excel workbook')
+        command.add_argument('sheet', help='name of the sheet')
+        command.add_argument('--model', choices=MODELS, default='average',
+                             help='prediction model (default average)')
+        command.add_argument('--json', action='store_true', help='print JSON instead of text')
+        command.set_defaults(function=function)
+        if name == 'optimize':
+            command.add_argument('--top', type=int, default=1,
+                                 help='also find the next best rosters')
+        if name == 'stats':
+            command.add_argument('--player', help='show one player only')
+        if name == 'charts':
+            command.add_argument('--out', default='charts', help='folder to write to')
+            command.add_argument('--processes', type=int, default=1,
+                                 help='number of worker processes')
+            command.add_argument('--format', default='png', help='image format (png, svg, pdf)')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    result = args.function(args)
+    if args.json:
+        print(json.dumps(result, indent=1, default=float))
+    return 0
+
+
+
+# --------------- MAIN FUNCTION ------------------
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+'''
+DAILY OPTIMIZER
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Takes a day by day schedule of which players play on which day of the
+     scoring week.
+  2) Solves each day's starting roster (only players with a game that day
+     can score) and totals the week.
+  3) Reports the expected points lost to bench conflicts: points of players
+     who play on a day when all their eligible slots are full.
+  4) Plans a whole league (many Teams x 7 days) in one call.
+
+Each player's points per game is their predicted ppg for the week (or the
+model's ppg estimate if they have no games in games_this_week).
+'''
+
+import numpy as np
+from lineupSolver import RosterTemplate, solve_lineup
+
+
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+# ---------------------- WEEK PLAN OBJECT ------------------------
+class WeekPlan(object):
+    '''
+      DESCRIPTION:
+          The daily starting rosters of one Team for a scoring week.
+
+      ATTRIBUTES:
+          rosters: list of 7 starting roster dicts (position -> Players)
+          points: numpy array of the expected points started each day
+          bench_points: numpy array of the expected points left on the
+                        bench each day by players who had a game
+
+      FUNCTIONS:
+          __init__
+          get_week_points
+          get_bench_points
+          print_plan
+    '''
+
+    def __init__(self, rosters, points, bench_points):
+        self.rosters = rosters
+        self.points = points
+        self.bench_points = bench_points
+
+    def get_week_points(self):
+        return round(float(self.points.sum()), 2)
+
+    def get_bench_points(self):
+        return round(float(self.bench_points.sum()), 2)
+
+    def print_plan(self):
+        print("\nDaily Starting Rosters:")
+        for day, roster in enumerate(self.rosters):
+            names = [p.get_name() for position in roster.keys() for p in roster[position]]
+            print('{:4} {:8.2f} {:8.2f}  {}'.format(DAYS[day], self.points[day],
+                                                    self.bench_points[day], ', '.join(names)))
+        print("Week Points: ", self.get_week_points())
+        print("Points Lost to Bench: ", self.get_bench_points())
+
+
+
+def schedule_matrix(team, schedule):
+    '''
+        Convert a schedule into a bool array of players x days.
+
+        @param: team, a Team
+                schedule, a dict of player name -> list of days (int 0-6 or
+                          names in DAYS), or an array-like of shape
+                          (players, 7) in the order of team.player_list
+        @return: numpy bool array of shape (players, 7)
+    '''
+    if not isinstance(schedule, dict):
+        plays = np.asarray(schedule, dtype=bool)
+        assert plays.shape == (len(team.player_list), len(DAYS)), "schedule shape must be (players, 7)"
+        return plays
+
+    plays = np.zeros((len(team.player_list), len(DAYS)), dtype=bool)
+    for i, p in enumerate(team.player_list):
+        for day in schedule.get(p.get_name(), []):
+            plays[i, DAYS.index(day) if isinstance(day, str) else day] = True
+    return plays
+
+
+def spread_schedule(team):
+    '''
+        A stand-in schedule when the real one is not known: each player's
+        games_this_week spread as evenly as possible over the week.
+
+        @param: team, a Team
+        @return: numpy bool array of shape (players, 7)
+    '''
+    games = np.minimum(team.table.get_column('predicted', 'games')[team._get_rows(team.player_list)],
+                       len(DAYS))
+    plays = np.zeros((len(games), len(DAYS)), dtype=bool)
+    for i, g in enumerate(games):
+        if g > 0:
+            plays[i, np.linspace(0, len(DAYS) - 1, g).round().astype(int)] = True
+    return plays
+
+
+def optimize_week(team, schedule, slots=None):
+    '''
+        Solve the starting roster of every day of the week.
+
+        @param: team, a Team
+                schedule, see schedule_matrix
+                slots, none (the Team's roster template) or a RosterTemplate
+                       or list of slot names
+        @return: WeekPlan
+    '''
+    template = RosterTemplate.from_slots(team.template if slots is None else slots)
+    plays = schedule_matrix(team, schedule)
+    rows = team._get_rows(team.player_list)
+    masks = team.table.pos_mask[rows]
+    per_game = expected_points_per_game(team, rows)
+
+    rosters = []
+    points = np.zeros(len(DAYS))
+    bench_points = np.zeros(len(DAYS))
+    for day in range(len(DAYS)):
+        playing = np.flatnonzero(plays[:, day] & (per_game > 0))
+        assignment = solve_lineup(per_game[playing], masks[playing], template)
+        filled = assignment >= 0
+        assignment[filled] = playing[assignment[filled]]
+        rosters.append(team._make_roster(assignment, template))
+
+        points[day] = per_game[assignment[filled]].sum()
+        bench_points[day] = per_game[playing].sum() - points[day]
+    return WeekPlan(rosters, np.round(points, 2), np.round(bench_points, 2))
+
+
+def optimize_league_week(teams, schedules, slots=None):
+    '''
+        Plan the week of every Team in a league.
+
+        @param: teams, a dict of team name -> Team
+                schedules, a dict of team name -> schedule, or one schedule
+                           dict (player name -> days) shared by all teams
+        @return: dict of team name -> WeekPlan
+    '''
+    # A team's schedule is a dict or a (players, 7) array; a shared schedule
+    # holds a list of days per player
+    first = next(iter(schedules.values()), None)
+    per_team = isinstance(first, dict) or np.ndim(first) == 2
+    plans = {}
+    for name, team in teams.items():
+        if per_team and name not in schedules:
+            raise KeyError("no schedule for team {}".format(name))
+        plans[name] = optimize_week(team, schedules[name] if per_team else schedules, slots)
+    return plans
+
+
+def expected_points_per_game(team, rows):
+    '''
+        Expected points per game of each player: the predicted ppg, or the
+        model's ppg estimate for players with no games in games_this_week.
+
+        @param: team, a Team
+                rows, numpy int array of table rows
+        @return: numpy float array
+    '''
+    table = team.table
+    per_game = table.get_column('predicted', 'ppg')[rows].copy()
+    no_games = table.get_column('predicted', 'games')[rows] == 0
+    if no_games.any():
+        per_game[no_games] = table.model.estimate_ppg(table, rows[no_games])
+    return per_game
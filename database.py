@@ -0,0 +1,388 @@
+'''
+DATABASE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Keeps players, their positions and every weekly stat line in a local
+     SQLite database file.
+  2) Bulk inserts whole sheets (or a whole workbook) in one transaction.
+  3) Loads the Team of any week, and optionally any fantasy roster, with a
+     single indexed query, without touching Excel.
+  4) Loads a whole season (every week, every roster) into a SeasonStore
+     with a single query.
+  5) Checks that every sheet of a workbook comes back out exactly as it
+     went in.
+
+Schema:
+  players(player_id, name)
+  weeks(week_id, label, season_order)    label is the sheet name
+  stat_lines(player_id, week_id, roster, sheet_row, nhl_team, position_1,
+             position_2, points_7, games_7, points_total, games_total,
+             games_this_week)
+             keyed (and so indexed) on (player_id, week_id, roster), and
+             indexed on (week_id, roster) for loading one Team and on
+             (week_id, position_1) and (week_id, position_2)
+
+The roster is the fantasy team a stat line belongs to ('' if the database
+only holds one team). A player's NHL team and positions are kept on every
+stat line, as they were on that week's sheet, since they change over a
+season (trades, new position eligibility).
+'''
+
+import sqlite3
+import numpy as np
+from sheetCache import read_sheet, warm_cache
+
+
+STAT_COLUMNS = ['points_7', 'games_7', 'points_total', 'games_total', 'games_this_week']
+LINE_COLUMNS = ['nhl_team', 'position_1', 'position_2'] + STAT_COLUMNS
+SCHEMA_VERSION = 2
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS players (
+    player_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS weeks (
+    week_id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE,
+    season_order INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stat_lines (
+    player_id INTEGER NOT NULL REFERENCES players(player_id),
+    week_id INTEGER NOT NULL REFERENCES weeks(week_id),
+    roster TEXT NOT NULL DEFAULT '',
+    sheet_row INTEGER NOT NULL,
+    nhl_team TEXT NOT NULL DEFAULT '',
+    position_1 TEXT NOT NULL DEFAULT '',
+    position_2 TEXT NOT NULL DEFAULT '',
+    points_7 REAL NOT NULL,
+    games_7 INTEGER NOT NULL,
+    points_total REAL NOT NULL,
+    games_total INTEGER NOT NULL,
+    games_this_week INTEGER NOT NULL,
+    PRIMARY KEY (player_id, week_id, roster)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS stat_lines_by_roster ON stat_lines(week_id, roster, sheet_row);
+CREATE INDEX IF NOT EXISTS stat_lines_by_position_1 ON stat_lines(week_id, position_1);
+CREATE INDEX IF NOT EXISTS stat_lines_by_position_2 ON stat_lines(week_id, position_2);
+'''
+
+# One row per stat line with the player's name, team and both positions
+_LINE_QUERY = '''
+SELECT w.label, s.roster, p.name, s.nhl_team, s.position_1, s.position_2,
+       s.points_7, s.games_7, s.points_total, s.games_total, s.games_this_week
+FROM stat_lines s
+JOIN weeks w ON w.week_id = s.week_id
+JOIN players p ON p.player_id = s.player_id
+'''
+
+
+# ---------------------- DATABASE OBJECT ------------------------
+class FantasyDatabase(object):
+    '''
+      DESCRIPTION:
+          A SQLite database of players and their weekly stat lines.
+
+      ATTRIBUTES:
+          path: string path of the database file (':memory:' for none)
+          connection: the sqlite3 connection
+
+      FUNCTIONS:
+          __init__
+          close
+          insert_sheet
+          insert_workbook
+          get_weeks
+          get_rosters
+          get_columns
+          get_table
+          get_team
+          get_players_by_position
+          to_season_store
+          check_workbook
+    '''
+
+    def __init__(self, path):
+        '''
+            Open (or create) a database file.
+
+            @param: path, string path of the database file
+        '''
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')
+        tables = [name for (name,) in self.connection.execute(
+                  "SELECT name FROM sqlite_master WHERE type = 'table'")]
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        assert not tables or version == SCHEMA_VERSION, \
+            "database made by an older version, delete it and insert the workbook again"
+        self.connection.executescript(SCHEMA)
+        self.connection.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+
+    def close(self):
+        self.connection.close()
+
+
+    def insert_sheet(self, week, columns, roster=''):
+        '''
+            Bulk insert one weekly sheet, replacing the roster's stat lines
+            for that week if it was inserted before. A player can be on
+            more than one roster in a week, but only once per roster.
+
+            @param: week, string label of the week (ie. the sheet name)
+                    columns, dict of sheet column name -> array-like, as given
+                             by sheetCache.read_sheet
+                    roster, string name of the fantasy team ('' for none)
+            @return: int number of stat lines inserted
+        '''
+        with self.connection:
+            return self._insert(week, columns, roster)
+
+
+    def insert_workbook(self, path, roster=''):
+        '''
+            Bulk insert every sheet of a workbook, in workbook order, in one
+            transaction. Sheets are read through the sheet cache.
+
+            @param: path, string path to the Excel workbook
+                    roster, string name of the fantasy team ('' for none)
+            @return: int number of stat lines inserted
+        '''
+        total = 0
+        with self.connection:
+            for sheet in warm_cache(path):
+                total += self._insert(sheet, read_sheet(path, sheet), roster)
+        return total
+
+
+    def get_weeks(self):
+        '''
+            @return: list of week labels in season order
+        '''
+        rows = self.connection.execute('SELECT label FROM weeks ORDER BY season_order')
+        return [label for (label,) in rows]
+
+
+    def get_rosters(self, week=-1):
+        '''
+            @param: week, label or index of the week (default latest)
+            @return: list of the fantasy team names with stat lines that week
+        '''
+        rows = self.connection.execute(
+                'SELECT DISTINCT roster FROM stat_lines WHERE week_id = ? ORDER BY roster',
+                (self._week_id(week),))
+        return [roster for (roster,) in rows]
+
+
+    def get_columns(self, week=-1, roster=None):
+        '''
+            Sheet columns of one week, in their order on the sheet, with one
+            query.
+
+            @param: week, label or index of the week (default latest)
+                    roster, none for every roster (only while no player is
+                            on two of them), or a fantasy team name
+            @return: dict of column name -> numpy array
+        '''
+        query = _LINE_QUERY + ' WHERE s.week_id = ?'
+        parameters = [self._week_id(week)]
+        if roster is not None:
+            query += ' AND s.roster = ?'
+            parameters.append(roster)
+        rows = self.connection.execute(query + ' ORDER BY s.roster, s.sheet_row',
+                                       parameters).fetchall()
+        columns = _to_columns(rows)
+        if roster is None:
+            _check_one_line_per_player(columns)
+        return columns
+
+
+    def get_table(self, week=-1, roster=None):
+        '''
+            @param: see get_columns
+            @return: PlayerTable
+        '''
+        from playerTable import PlayerTable
+        return PlayerTable(self.get_columns(week, roster))
+
+
+    def get_team(self, week=-1, roster=None):
+        '''
+            @param: see get_columns
+            @return: Team as it was that week
+        '''
+        from teamBuilder import Team
+        return Team(table=self.get_table(week, roster))
+
+
+    def get_players_by_position(self, position, week=-1):
+        '''
+            @param: position, a position string, ie. 'D'
+                    week, label or index of the week (default latest)
+            @return: list of the names of every player with that position
+                     on the week's sheets
+        '''
+        rows = self.connection.execute(
+                'SELECT DISTINCT p.name FROM stat_lines s JOIN players p ON p.player_id = s.player_id '
+                'WHERE s.week_id = ?1 AND (s.position_1 = ?2 OR s.position_2 = ?2) ORDER BY p.name',
+                (self._week_id(week), position))
+        return [name for (name,) in rows]
+
+
+    def to_season_store(self, roster=None):
+        '''
+            Load every week into a SeasonStore with one query. A store holds
+            one line per player and week, so give a roster if the same
+            player is on more than one.
+
+            @param: roster, none for every roster, or a fantasy team name
+            @return: SeasonStore
+        '''
+        from seasonStore import SeasonStore
+        query = _LINE_QUERY
+        parameters = []
+        if roster is not None:
+            query += ' WHERE s.roster = ?'
+            parameters.append(roster)
+        rows = self.connection.execute(query + ' ORDER BY w.season_order, s.roster, s.sheet_row',
+                                       parameters).fetchall()
+
+        store = SeasonStore()
+        labels = [row[0] for row in rows]
+        start = 0
+        while start < len(rows):
+            end = start
+            while end < len(rows) and labels[end] == labels[start]:
+                end += 1
+            columns = _to_columns(rows[start:end])
+            if roster is None:
+                _check_one_line_per_player(columns)
+            store.append_week(labels[start], columns)
+            start = end
+        return store
+
+
+    def check_workbook(self, path, roster=''):
+        '''
+            Compare every sheet of a workbook with what the database gives
+            back for it, column by column. Strings are compared with
+            missing cells as '', and numbers exactly.
+
+            @param: path, string path to the Excel workbook
+                    roster, string name of the fantasy team it was inserted as
+            @return: dict of sheet name -> list of the columns that differ
+                     (empty if the sheet round-trips exactly)
+        '''
+        result = {}
+        for sheet in warm_cache(path):
+            expected = read_sheet(path, sheet)
+            found = self.get_columns(sheet, roster)
+            n = len(expected['name'])
+            differ = []
+            for column in ['name', 'team', 'position_1', 'position_2']:
+                if _strings(expected.get(column), n) != list(found[column]):
+                    differ.append(column)
+            for column in STAT_COLUMNS:
+                if not np.array_equal(np.asarray(expected[column], dtype=float),
+                                      found[column].astype(float)):
+                    differ.append(column)
+            result[sheet] = differ
+        return result
+
+
+    def _insert(self, week, columns, roster):
+        cursor = self.connection.cursor()
+        names = [str(x) for x in columns['name']]
+        n = len(names)
+        lines = [_strings(columns.get('team'), n), _strings(columns.get('position_1'), n),
+                 _strings(columns.get('position_2'), n)]
+        lines += [np.asarray(columns[column]).tolist() for column in STAT_COLUMNS]
+
+        cursor.executemany('INSERT OR IGNORE INTO players (name) VALUES (?)',
+                           [(name,) for name in names])
+        ids = dict(cursor.execute('SELECT name, player_id FROM players'))
+        player_ids = [ids[name] for name in names]
+
+        cursor.execute('INSERT OR IGNORE INTO weeks (label, season_order) '
+                       'VALUES (?, (SELECT COUNT(*) FROM weeks))', (week,))
+        week_id = self._week_id(week)
+        cursor.execute('DELETE FROM stat_lines WHERE week_id = ? AND roster = ?', (week_id, roster))
+        # A plain INSERT: a player twice on one roster's sheet is an error,
+        # never a silent replace
+        cursor.executemany('INSERT INTO stat_lines (player_id, week_id, roster, sheet_row, '
+                           + ', '.join(LINE_COLUMNS) + ') VALUES ('
+                           + ', '.join(['?'] * (4 + len(LINE_COLUMNS))) + ')',
+                           [(i, week_id, roster, row) + line for row, (i, line) in
+                            enumerate(zip(player_ids, zip(*lines)))])
+        return n
+
+
+    def _week_id(self, week):
+        '''
+            @param: week, a week label or an int index (negative counts back
+                    from the latest week)
+            @return: int week_id
+        '''
+        if isinstance(week, str):
+            found = self.connection.execute('SELECT week_id FROM weeks WHERE label = ?',
+                                            (week,)).fetchone()
+            assert found is not None, "week not in the database"
+            return found[0]
+        ids = [i for (i,) in self.connection.execute('SELECT week_id FROM weeks ORDER BY season_order')]
+        return ids[week]
+
+
+
+def _strings(values, n):
+    '''
+        Strings of a column, '' where missing (None or nan).
+    '''
+    if values is None:
+        return [''] * n
+    return ['' if not isinstance(x, str) else x for x in values]
+
+
+def _check_one_line_per_player(columns):
+    '''
+        Assert that no player is on more than one roster of the same week.
+    '''
+    names = list(columns['name'])
+    assert len(set(names)) == len(names), \
+        "{} on more than one roster, give a roster".format(
+            sorted({name for name in names if names.count(name) > 1}))
+
+
+def _to_columns(rows):
+    '''
+        @param: rows, list of _LINE_QUERY result tuples
+        @return: dict of sheet column name -> numpy array
+    '''
+    fields = list(zip(*rows)) if rows else [()] * 11
+    columns = {'roster': np.array(fields[1], dtype=object),
+               'name': np.array(fields[2], dtype=object),
+               'team': np.array(fields[3], dtype=object),
+               'position_1': np.array(fields[4], dtype=object),
+               'position_2': np.array(fields[5], dtype=object)}
+    for i, column in enumerate(STAT_COLUMNS):
+        columns[column] = np.array(fields[6 + i], dtype=float if column.startswith('points') else np.int64)
+    return columns
+
+
+
+# --------------- MAIN FUNCTION ------------------
+if __name__ == '__main__':
+    '''
+    Insert a workbook into a database in memory and check that every sheet
+    comes back exactly: python database.py FantasyTeamPoints.xlsx
+    '''
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else 'FantasyTeamPoints.xlsx'
+    db = FantasyDatabase(':memory:')
+    db.insert_workbook(path)
+    checked = db.check_workbook(path)
+    for sheet, differ in checked.items():
+        print('{:12} {}'.format(sheet, 'ok' if not differ else 'differs: ' + ', '.join(differ)))
+    sys.exit(0 if not any(checked.values()) else 1)
@@ -0,0 +1,266 @@
+'''
+DRAFT SIMULATOR
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Computes every player's value over replacement (VOR): their projected
+     points minus those of the best player at their position that no team
+     would need to start (ie. the 25th best C in a 12 team league that
+     starts 2 C each).
+  2) Simulates thousands of snake drafts at once. Every draft is a row of
+     the same arrays, so each pick is one vectorized step over all drafts.
+  3) Opponents pick with a configurable strategy (best available, best
+     VOR, or best VOR at a position they still need to fill), plus random
+     noise so that every draft goes differently.
+  4) For each of our pick strategies, reports the expected points of the
+     optimal starting lineup of the roster we end up with.
+
+The player pool is a PlayerTable in the usual sheet schema; players are
+valued by their predicted points unless other values are given.
+'''
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from lineupSolver import POSITION_BITS, RosterTemplate, solve_lineup
+
+
+STRATEGIES = ['best_available', 'vor', 'need']
+DEFAULT_TEAMS = 12
+DEFAULT_ROUNDS = 16
+DEFAULT_NOISE = 0.25 # Opponents' pick noise, in standard deviations of VOR
+
+
+# ----------------------- DRAFT RESULT OBJECT ---------------------------
+class DraftResult(object):
+    '''
+      DESCRIPTION:
+          The optimal lineup points of our roster after each simulated draft,
+          for each of our pick strategies.
+
+      ATTRIBUTES:
+          points: dict of strategy -> numpy array, one total per draft
+          rosters: dict of strategy -> int array of shape (drafts, rounds),
+                   the table rows we drafted, in pick order
+
+      FUNCTIONS:
+          __init__
+          summary
+          print_summary
+    '''
+
+    def __init__(self, points, rosters):
+        self.points = points
+        self.rosters = rosters
+
+    def summary(self):
+        '''
+            @return: dict of strategy -> dict of the number of drafts, the
+                     mean (expected) lineup points, std and 10th / 90th
+                     percentiles
+        '''
+        result = {}
+        for strategy, points in self.points.items():
+            low, high = np.percentile(points, [10, 90])
+            result[strategy] = {'drafts': len(points),
+                                'mean': round(float(points.mean()), 2),
+                                'std': round(float(points.std()), 2),
+                                'p10': round(float(low), 2),
+                                'p90': round(float(high), 2)}
+        return result
+
+    def print_summary(self):
+        print("\nExpected Optimal Lineup Points by Draft Strategy:")
+        print('{:16} {:>8} {:>10} {:>8} {:>10} {:>10}'.format("strategy", "drafts", "mean",
+                                                           "std", "p10", "p90"))
+        for strategy, s in self.summary().items():
+            print('{:16} {:>8} {:>10} {:>8} {:>10} {:>10}'.format(
+                    strategy, s['drafts'], s['mean'], s['std'], s['p10'], s['p90']))
+
+
+
+def value_over_replacement(values, masks, n_teams=DEFAULT_TEAMS, slots=None):
+    '''
+        Value over replacement of every player. The replacement level of a
+        position is the value of the best player left after every team
+        fills its starting slots there. A flex slot counts as a share of a
+        slot for each position that can fill it (ie. a UTIL slot is a
+        quarter slot for each of C, L, R and D). A player eligible at two
+        positions gets the better of their two VORs.
+
+        @param: values, array-like of projected points, one per player
+                masks, array-like of position bitmasks, one per player
+                n_teams, int number of teams in the league
+                slots, none (the Team's STARTING_SLOTS), a RosterTemplate or a
+                       list of slot names
+        @return: (vor, replacement), a numpy array of VOR per player and a
+                 dict of position -> replacement value
+    '''
+    from teamBuilder import STARTING_SLOTS
+    template = RosterTemplate.from_slots(STARTING_SLOTS if slots is None else slots)
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    masks = np.asarray(masks, dtype=np.int64)
+
+    replacement = {}
+    vor = np.full(len(values), -np.inf)
+    for position, bit in POSITION_BITS.items():
+        shares = [template.counts[name] / len(filled_by)
+                  for name, filled_by in template.positions.items() if position in filled_by]
+        if not shares:
+            continue
+        eligible = (masks & bit) != 0
+        ranked = np.sort(values[eligible])[::-1]
+        starters = int(round(n_teams * sum(shares)))
+        replacement[position] = float(ranked[starters]) if len(ranked) > starters else 0.0
+        vor = np.where(eligible, np.maximum(vor, values - replacement[position]), vor)
+    vor[np.isinf(vor)] = values[np.isinf(vor)] - max(replacement.values(), default=0.0)
+    return vor, replacement
+
+
+def simulate_drafts(table, strategies=STRATEGIES, opponents='vor', n_drafts=1000,
+                    n_teams=DEFAULT_TEAMS, rounds=DEFAULT_ROUNDS, pick=None, noise=DEFAULT_NOISE,
+                    values=None, slots=None, seed=0, processes=1, batch_size=100):
+    '''
+        Simulate snake drafts for each of our pick strategies.
+
+        @param: table, a PlayerTable of the player pool
+                strategies, list of our strategies to compare (see STRATEGIES)
+                opponents, one strategy for every opponent, or a list of one
+                           per draft position (ours is ignored)
+                n_drafts, int number of drafts per strategy
+                n_teams, int number of teams in the league
+                rounds, int number of players each team drafts
+                pick, none for a random draft position each draft, or our
+                      draft position (0 picks first)
+                noise, float std of the random noise added to opponents'
+                       pick scores, relative to the std of VOR
+                values, none (predicted points) or an array of projected
+                        points per player
+                slots, none (the Team's STARTING_SLOTS), a RosterTemplate or a
+                       list of slot names
+                seed, int seed for repeatable drafts
+                processes, int number of worker processes (1 runs here)
+                batch_size, int number of drafts simulated at once
+        @return: DraftResult
+    '''
+    from teamBuilder import STARTING_SLOTS
+    slots = RosterTemplate.from_slots(STARTING_SLOTS if slots is None else slots)
+    values = table.get_column('predicted', 'pts') if values is None else values
+    values = np.nan_to_num(np.asarray(values, dtype=float))
+    masks = table.pos_mask
+    assert len(values) >= n_teams * rounds, "the pool is too small for the draft"
+    if isinstance(opponents, str):
+        opponents = [opponents] * n_teams
+    assert len(opponents) == n_teams, "give one opponent strategy per draft position"
+    for strategy in list(strategies) + list(opponents):
+        assert strategy in STRATEGIES, "unknown strategy {}".format(strategy)
+
+    vor, _ = value_over_replacement(values, masks, n_teams, slots)
+    # Every strategy sees the same draft positions and opponents' opinions,
+    # so the differences between strategies are not down to luck
+    jobs = [(strategy, min(batch_size, n_drafts - start), seed + start)
+            for strategy in strategies for start in range(0, n_drafts, batch_size)]
+    league = (values, masks, vor, list(opponents), n_teams, rounds, pick, noise, slots)
+
+    if processes == 1:
+        _init_worker(*league)
+        results = [_run_batch(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=league) as pool:
+            results = list(pool.map(_run_batch, jobs))
+
+    points = {strategy: [] for strategy in strategies}
+    rosters = {strategy: [] for strategy in strategies}
+    for (strategy, _, _), (batch_points, batch_rosters) in zip(jobs, results):
+        points[strategy].append(batch_points)
+        rosters[strategy].append(batch_rosters)
+    return DraftResult({s: np.concatenate(p) for s, p in points.items()},
+                       {s: np.concatenate(r) for s, r in rosters.items()})
+
+
+def snake_order(n_teams, rounds):
+    '''
+        @return: numpy int array, the draft position on the clock at each
+                 pick (0, 1, ..., n-1, n-1, ..., 0, 0, 1, ...)
+    '''
+    order = np.arange(n_teams)
+    return np.concatenate([order if r % 2 == 0 else order[::-1] for r in range(rounds)])
+
+
+
+# Worker state, the pool and league settings shared by every batch
+_WORKER = {}
+
+
+def _init_worker(values, masks, vor, opponents, n_teams, rounds, pick, noise, slots):
+    _WORKER.update(values=values, masks=masks, vor=vor, opponents=opponents, n_teams=n_teams,
+                   rounds=rounds, pick=pick, noise=noise, slots=slots)
+
+
+def _run_batch(job):
+    '''
+        Run a batch of drafts with one of our strategies, all drafts at once.
+
+        @param: job, (strategy, number of drafts, seed)
+        @return: (points, rosters), the optimal lineup points of our roster
+                 in each draft and the table rows we drafted
+    '''
+    strategy, n_drafts, seed = job
+    values, masks, vor = _WORKER['values'], _WORKER['masks'], _WORKER['vor']
+    n_teams, rounds, slots = _WORKER['n_teams'], _WORKER['rounds'], _WORKER['slots']
+    pick, noise = _WORKER['pick'], _WORKER['noise']
+    rng = np.random.default_rng(seed)
+    n_players = len(values)
+    drafts = np.arange(n_drafts)
+    ours = rng.integers(0, n_teams, n_drafts) if pick is None else np.full(n_drafts, pick)
+
+    # Starting slots still open per draft, team and kind of slot
+    bits = np.array([slots.slot_masks[slots.index(name)] for name in slots.names], dtype=np.int64)
+    open_slots = np.tile(np.array([slots.counts[name] for name in slots.names]),
+                         (n_drafts, n_teams, 1))
+
+    codes = {name: i for i, name in enumerate(STRATEGIES)}
+    opponent_codes = np.array([codes[s] for s in _WORKER['opponents']])
+    spread = noise * (vor.std() if len(vor) > 1 else 1.0)
+    big = 2.0 * (np.abs(vor).max() + np.abs(values).max()) + 1.0
+
+    # Each opponent ranks the players of a draft with their own noise, drawn
+    # once per draft rather than at every pick. float32, as this is the
+    # largest array of a batch (drafts x teams x players)
+    opinion = np.zeros((n_drafts, n_teams, n_players), dtype=np.float32)
+    if spread > 0:
+        opinion = rng.standard_normal(opinion.shape, dtype=np.float32)
+        opinion *= spread
+        opinion[drafts, ours] = 0.0
+    taken = np.zeros((n_drafts, n_players)) # -inf once a player is drafted
+
+    rosters = np.zeros((n_drafts, rounds), dtype=int)
+    for number, team in enumerate(snake_order(n_teams, rounds)):
+        is_ours = ours == team
+        code = np.where(is_ours, codes[strategy], opponent_codes[team])
+
+        # Positions still needed by the team on the clock, as one bitmask
+        needed = np.bitwise_or.reduce(np.where(open_slots[:, team, :] > 0, bits, 0), axis=1)
+        fills_need = (masks[None, :] & needed[:, None]) != 0
+        scores = np.where(code[:, None] == codes['best_available'], values[None, :], vor[None, :])
+        scores += np.where((code == codes['need'])[:, None] & fills_need, big, 0.0)
+        scores += opinion[:, team, :]
+        scores += taken
+
+        chosen = np.argmax(scores, axis=1)
+        taken[drafts, chosen] = -np.inf
+
+        # Fill the first open slot the player can play
+        fills = (open_slots[:, team, :] > 0) & ((masks[chosen][:, None] & bits[None, :]) != 0)
+        filling = fills.any(axis=1)
+        first = np.argmax(fills, axis=1)
+        open_slots[drafts[filling], team, first[filling]] -= 1
+
+        round_number = number // n_teams
+        rosters[is_ours, round_number] = chosen[is_ours]
+
+    points = np.zeros(n_drafts)
+    for d in range(n_drafts):
+        roster = rosters[d]
+        assignment = solve_lineup(values[roster], masks[roster], slots)
+        points[d] = values[roster[assignment[assignment >= 0]]].sum()
+    return np.round(points, 2), rosters
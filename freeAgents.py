@@ -0,0 +1,124 @@
+'''
+FREE AGENTS
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Scores every add/drop pair between a pool of free agents and a Team:
+     the change in the predicted points of the optimal starting roster if
+     the free agent replaced the dropped player.
+  2) Returns the pairs ranked by that gain.
+
+Method:
+  A free agent either sits on the bench (the lineup is the best one of the
+  roster without the dropped player) or starts at one of their positions
+  (the lineup is the free agent plus the best lineup of the rest of the
+  roster with that slot taken). So for each drop d and slot position t the
+  solver is run once on the Team's own players, giving a threshold: the
+  points a free agent needs to start at t after dropping d. That is about
+  (roster size x 6) small solves, whatever the size of the pool, and every
+  free agent is then scored against the thresholds in one array operation.
+  The result is exactly the same as re-solving the lineup for every pair.
+'''
+
+import numpy as np
+from lineupSolver import RosterTemplate, solve_assignment
+
+
+def lineup_thresholds(team, slots=None):
+    '''
+        Best lineup of the Team without each player, with and without one
+        slot of each position taken by an outside player.
+
+        @param: team, a Team
+                slots, none (the Team's roster template) or a RosterTemplate
+                       or list of slot names
+        @return: (positions, filled, points), where positions is the list
+                 of slot names, and filled and points are numpy arrays of
+                 shape (players, len(positions) + 1) with the number of
+                 filled slots and the points of that lineup. The last
+                 column is the lineup with no slot taken.
+    '''
+    template = RosterTemplate.from_slots(team.template if slots is None else slots)
+    rows = team._get_rows(team.player_list)
+    weights = np.nan_to_num(team.table.get_column('predicted', 'pts')[rows])
+    eligible = template.eligibility(team.table.pos_mask[rows])
+    positions = template.names
+
+    n = len(rows)
+    filled = np.zeros((n, len(positions) + 1), dtype=int)
+    points = np.zeros((n, len(positions) + 1))
+    for d in range(n):
+        keep = np.delete(np.arange(n), d)
+        for t, position in enumerate(positions + [None]):
+            slot_rows = list(range(len(template)))
+            if position is not None:
+                slot_rows.remove(template.index(position))
+            assignment = solve_assignment(weights[keep], eligible[np.ix_(slot_rows, keep)])
+            used = keep[assignment[assignment >= 0]]
+            filled[d, t] = len(used)
+            points[d, t] = weights[used].sum()
+    return positions, filled, points
+
+
+def evaluate_free_agents(team, free_agents, top=50, slots=None):
+    '''
+        Rank every add/drop pair by the gain in predicted starting roster
+        points.
+
+        @param: team, a Team
+                free_agents, a PlayerTable of the free agent pool, ie.
+                             PlayerTable(read_sheet(path, 'FreeAgents'))
+                top, int number of pairs to return, or none for all
+                slots, none (the Team's roster template) or a RosterTemplate
+                       or list of slot names
+        @return: list of (gain, free agent name, dropped player name)
+                 tuples, in descending order of gain
+    '''
+    template = RosterTemplate.from_slots(team.template if slots is None else slots)
+    rows = team._get_rows(team.player_list)
+    weights = np.nan_to_num(team.table.get_column('predicted', 'pts')[rows])
+    current = solve_assignment(weights, template.eligibility(team.table.pos_mask[rows]))
+    base_filled = int((current >= 0).sum())
+    base_points = weights[current[current >= 0]].sum()
+
+    # Free agents not already on the team
+    on_team = set(team.table.names[rows])
+    pool = np.array([i for i, name in enumerate(free_agents.names) if name not in on_team],
+                    dtype=int)
+    agent_points = np.nan_to_num(free_agents.get_column('predicted', 'pts')[pool])
+    agent_masks = free_agents.pos_mask[pool]
+
+    positions, filled, points = lineup_thresholds(team, template)
+
+    # Lineups are compared like the solver does: filled slots first, then
+    # points. Start from the free agent on the bench, then try each slot.
+    best_filled = np.repeat(filled[:, -1:], len(pool), axis=1)  # (drops, agents)
+    best_points = np.repeat(points[:, -1:], len(pool), axis=1)
+    for t, position in enumerate(positions):
+        can_start = (agent_masks & template.slot_masks[template.index(position)]) != 0
+        starts_filled = filled[:, t:t + 1] + 1
+        starts_points = points[:, t:t + 1] + agent_points[None, :]
+        better = can_start[None, :] & ((starts_filled > best_filled) |
+                                       ((starts_filled == best_filled) & (starts_points > best_points)))
+        best_filled = np.where(better, starts_filled, best_filled)
+        best_points = np.where(better, starts_points, best_points)
+
+    gain = np.round(best_points - base_points, 2)
+    gain[best_filled < base_filled] = -np.inf # the lineup would be left short
+
+    order = np.argsort(-gain, axis=None, kind='stable')
+    if top is not None:
+        order = order[:top]
+    drops, agents = np.unravel_index(order, gain.shape)
+    return [(float(gain[d, a]), free_agents.names[pool[a]], team.player_list[d].get_name())
+            for d, a in zip(drops, agents)]
+
+
+def print_free_agents(ranking):
+    '''
+        @param: ranking, the list returned by evaluate_free_agents
+    '''
+    print("\nBest Free Agent Pickups:")
+    print('{:8} {:24} {:24}'.format("gain", "add", "drop"))
+    for gain, add, drop in ranking:
+        print('{:<8} {:24} {:24}'.format(gain, add, drop))
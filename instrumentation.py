@@ -0,0 +1,203 @@
+'''
+INSTRUMENTATION
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Opt-in timing spans around the hot paths (loading a team, Excel
+     parsing, building the PlayerTable and Player objects, calculating
+     stats and predictions, solving lineups).
+  2) Counters, ie. the number of lineup assignments solved.
+  3) A report of both, as JSON or as a plain text summary.
+
+Instrumentation is off by default. Turn it on with enable(), or by setting
+the FTB_INSTRUMENT environment variable to 1. While it is off, a span is a
+shared do-nothing context manager and a count is a single flag check, so
+the instrumented code runs at the same speed.
+
+Usage:
+  import instrumentation
+  instrumentation.enable()
+  team = Team('FantasyTeamPoints.xlsx', 'Dec03Data')
+  team.set_optimal_starting_roster()
+  instrumentation.print_report()
+'''
+
+import os
+import json
+import time
+from functools import wraps
+
+
+# ------------------ INSTRUMENTATION OBJECTS ---------------------
+class Recorder(object):
+    '''
+      DESCRIPTION:
+          Collects the span timings and counters since it was enabled (or
+          last reset).
+
+      ATTRIBUTES:
+          enabled: True if spans and counts are being recorded
+          spans: dict of span name -> [calls, total seconds, max seconds]
+          counters: dict of counter name -> int
+
+      FUNCTIONS:
+          __init__
+          reset
+    '''
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.spans = {}
+        self.counters = {}
+
+
+class _Span(object):
+    '''
+      DESCRIPTION:
+          Context manager timing one call of a span. Spans may be nested.
+    '''
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        record = RECORDER.spans.get(self.name)
+        if record is None:
+            RECORDER.spans[self.name] = [1, seconds, seconds]
+        else:
+            record[0] += 1
+            record[1] += seconds
+            record[2] = max(record[2], seconds)
+        return False
+
+
+class _NullSpan(object):
+    '''
+      DESCRIPTION:
+          Context manager that does nothing, used while disabled.
+    '''
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+RECORDER = Recorder(enabled=os.environ.get('FTB_INSTRUMENT', '') not in ('', '0'))
+_NULL_SPAN = _NullSpan()
+
+
+
+def enable():
+    RECORDER.enabled = True
+
+
+def disable():
+    RECORDER.enabled = False
+
+
+def reset():
+    RECORDER.reset()
+
+
+def is_enabled():
+    return RECORDER.enabled
+
+
+def span(name):
+    '''
+        Time a block of code.
+
+        @param: name, string name of the span, ie. 'create_team.read_sheet'
+        @return: context manager
+    '''
+    return _Span(name) if RECORDER.enabled else _NULL_SPAN
+
+
+def timed(name):
+    '''
+        Decorator timing every call of a function as a span.
+
+        @param: name, string name of the span
+        @return: decorator
+    '''
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return function(*args, **kwargs)
+            with _Span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    '''
+        Add to a counter. For counts made in a loop, count locally and add
+        the total once after the loop.
+
+        @param: name, string name of the counter
+                n, int amount to add
+        @return: none
+    '''
+    if RECORDER.enabled:
+        RECORDER.counters[name] = RECORDER.counters.get(name, 0) + n
+
+
+def get_report():
+    '''
+        @return: dict with 'spans' (name -> calls, total, mean and max
+                 seconds) and 'counters' (name -> int)
+    '''
+    spans = {}
+    for name, (calls, total, longest) in RECORDER.spans.items():
+        spans[name] = {'calls': calls, 'total_s': round(total, 6),
+                       'mean_s': round(total / calls, 6), 'max_s': round(longest, 6)}
+    return {'enabled': RECORDER.enabled, 'spans': spans, 'counters': dict(RECORDER.counters)}
+
+
+def report_json(path=None):
+    '''
+        @param: path, none or a string path to write the JSON report to
+        @return: the report as a JSON string
+    '''
+    text = json.dumps(get_report(), indent=1)
+    if path is not None:
+        with open(path, 'w') as f:
+            f.write(text)
+    return text
+
+
+def report_text():
+    '''
+        @return: the report as a plain text table, spans slowest first
+    '''
+    report = get_report()
+    lines = ['{:40} {:>8} {:>12} {:>12} {:>12}'.format("span", "calls", "total_s",
+                                                       "mean_s", "max_s")]
+    for name, s in sorted(report['spans'].items(), key=lambda item: -item[1]['total_s']):
+        lines.append('{:40} {:>8} {:>12.6f} {:>12.6f} {:>12.6f}'.format(
+                name, s['calls'], s['total_s'], s['mean_s'], s['max_s']))
+    if report['counters']:
+        lines.append('')
+        lines.append('{:40} {:>8}'.format("counter", "value"))
+        for name, value in sorted(report['counters'].items()):
+            lines.append('{:40} {:>8}'.format(name, value))
+    return '\n'.join(lines)
+
+
+def print_report():
+    print("\nInstrumentation Report:")
+    print(report_text())
@@ -0,0 +1,202 @@
+'''
+LEAGUE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Loads the rosters of every fantasy team in a league into one shared
+     PlayerTable, with each Team a view of its own rows.
+  2) Predicts every roster's points in one vectorized pass over the table.
+  3) Sets the optimal starting roster of every team, spread across a
+     process pool, and reports the throughput in rosters per second.
+  4) Collects the results into one summary.
+
+Rosters can come from one sheet per team (the usual workbook layout), or
+from a single sheet with a column naming each player's fantasy team.
+'''
+
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from lineupSolver import solve_lineup
+from playerTable import PlayerTable
+from sheetCache import read_sheet
+
+
+# -------------------------- LEAGUE OBJECT ---------------------------
+class League(object):
+    '''
+      DESCRIPTION:
+          A League is a collection of Teams sharing one PlayerTable.
+
+      ATTRIBUTES:
+          table: the PlayerTable of every rostered player in the league
+          teams: dict of fantasy team name -> Team
+          template: the RosterTemplate of the league's starting roster slots
+          last_run: dict of timing stats from the last optimize() call
+
+      FUNCTIONS:
+          __init__
+          from_sheets
+          from_sheet
+          get_team
+          predict_team_points
+          optimize
+          summary
+          print_summary
+    '''
+
+    def __init__(self, table, rosters, template=None):
+        '''
+            @param: table, a PlayerTable of every player in the league
+                    rosters, dict of fantasy team name -> list/array of the
+                             table rows on that team
+                    template, none (DEFAULT_TEMPLATE) or a RosterTemplate
+        '''
+        from teamBuilder import DEFAULT_TEMPLATE, Team
+        self.table = table
+        self.template = DEFAULT_TEMPLATE if template is None else template
+        self.teams = {name: Team(table=table, rows=rows, template=self.template)
+                      for name, rows in rosters.items()}
+        self.last_run = {}
+
+
+    @classmethod
+    def from_sheets(cls, path, sheets, template=None):
+        '''
+            Load a league where each sheet is one team's roster.
+
+            @param: path, string path to the Excel workbook
+                    sheets, dict of fantasy team name -> sheet name, or a
+                            list of sheet names (used as the team names)
+                    template, none (DEFAULT_TEMPLATE) or a RosterTemplate
+            @return: League
+        '''
+        if not isinstance(sheets, dict):
+            sheets = {sheet: sheet for sheet in sheets}
+        parts = {name: read_sheet(path, sheet) for name, sheet in sheets.items()}
+
+        rosters = {}
+        start = 0
+        for name, columns in parts.items():
+            n = len(columns['name'])
+            rosters[name] = np.arange(start, start + n)
+            start += n
+        keys = set.intersection(*[set(columns.keys()) for columns in parts.values()])
+        merged = {key: np.concatenate([columns[key] for columns in parts.values()])
+                  for key in keys}
+        return cls(PlayerTable(merged), rosters, template)
+
+
+    @classmethod
+    def from_sheet(cls, path, sheet, team_column='fantasy_team', template=None):
+        '''
+            Load a league from one sheet listing every rostered player.
+
+            @param: path, string path to the Excel workbook
+                    sheet, string name of the sheet
+                    team_column, the column naming each player's fantasy team
+                    template, none (DEFAULT_TEMPLATE) or a RosterTemplate
+            @return: League
+        '''
+        columns = read_sheet(path, sheet)
+        table = PlayerTable(columns)
+        owners = np.asarray(columns[team_column])
+        rosters = {str(name): np.flatnonzero(owners == name) for name in np.unique(owners)}
+        return cls(table, rosters, template=template)
+
+
+    def get_team(self, name):
+        return self.teams[name]
+
+
+    def predict_team_points(self):
+        '''
+            Predicted points of every whole roster. Predictions are already
+            calculated for the whole table, so this is one sum per team.
+
+            @return: dict of fantasy team name -> float
+        '''
+        predicted = self.table.get_column('predicted', 'pts')
+        return {name: round(float(predicted[team._get_rows(team.player_list)].sum()), 2)
+                for name, team in self.teams.items()}
+
+
+    def optimize(self, processes=1, chunk_size=32):
+        '''
+            Set the optimal starting roster of every Team.
+
+            @param: processes, int number of worker processes (1 solves in
+                               this process, which is fastest for a few
+                               hundred rosters or less)
+                    chunk_size, int number of rosters sent to a worker at once
+            @return: dict of timing stats, also kept in self.last_run
+        '''
+        start = time.perf_counter()
+        weights = self.table.get_column('predicted', 'pts')
+        masks = self.table.pos_mask
+        jobs = [(name, team._get_rows(team.player_list)) for name, team in self.teams.items()]
+        chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+        if processes == 1:
+            _init_worker(weights, masks, self.template)
+            results = [_solve_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(processes, initializer=_init_worker,
+                                     initargs=(weights, masks, self.template)) as pool:
+                results = list(pool.map(_solve_chunk, chunks))
+
+        for chunk in results:
+            for name, assignment in chunk:
+                team = self.teams[name]
+                team.starting_roster = team._make_roster(assignment)
+                team._roster_is_optimal = True
+
+        seconds = time.perf_counter() - start
+        self.last_run = {'rosters': len(jobs), 'processes': processes,
+                         'seconds': round(seconds, 4),
+                         'rosters_per_second': round(len(jobs) / seconds, 1) if seconds else None}
+        return self.last_run
+
+
+    def summary(self):
+        '''
+            @return: dict of fantasy team name -> dict of the predicted points
+                     of the whole roster and of the starting roster, and the
+                     starters' names by position
+        '''
+        roster_points = self.predict_team_points()
+        return {name: {'roster_points': roster_points[name],
+                       'starting_points': team.predict_starting_roster_next_points(),
+                       'starting_roster': {position: [p.get_name() for p in players]
+                                           for position, players in team.starting_roster.items()}}
+                for name, team in self.teams.items()}
+
+
+    def print_summary(self):
+        print("\nLeague Summary:")
+        print('{:16} {:12} {:12}'.format("team", "roster_pts", "starting_pts"))
+        for name, result in self.summary().items():
+            print('{:16} {:<12} {:<12}'.format(name, result['roster_points'],
+                                               result['starting_points']))
+        if self.last_run:
+            print("Rosters per second: ", self.last_run['rosters_per_second'])
+
+
+
+# Worker state, set once per process so the table is not sent with every task
+_WORKER = {}
+
+
+def _init_worker(weights, masks, slots):
+    _WORKER['weights'] = weights
+    _WORKER['masks'] = masks
+    _WORKER['slots'] = slots
+
+
+def _solve_chunk(chunk):
+    '''
+        @param: chunk, list of (team name, table rows)
+        @return: list of (team name, assignment as indexes into the rows)
+    '''
+    weights, masks, slots = _WORKER['weights'], _WORKER['masks'], _WORKER['slots']
+    return [(name, solve_lineup(weights[rows], masks[rows], slots)) for name, rows in chunk]
@@ -0,0 +1,397 @@
+'''
+LINEUP SERVICE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) A local HTTP/JSON service, on asyncio, that keeps the season's data
+     and every Team it has loaded in memory, so repeated calls skip the
+     Excel parsing and set up. Endpoints (all GET):
+       - /stats?sheet=Dec03Data[&player=Pionk]: team or player stats
+       - /predict?sheet=Dec03Data[&model=ewma]: next week's predictions
+       - /optimize?sheet=Dec03Data[&model=ewma][&top=3]: optimal lineup
+       - /player?name=Pionk[&sheet=Dec03Data]: one player's info
+       - /metrics: request counts and p50/p99 latency per endpoint
+     The sheet defaults to the latest one, and the model to 'average'.
+  2) Lineup solves run off the event loop, in a worker thread or a pool of
+     worker processes, so slow solves never hold up quick lookups.
+  3) Concurrent identical optimize requests are coalesced: they all wait
+     for one solve and get the same answer.
+
+Uses only the standard library (and the rest of FantasyTeamBuilder), with
+a minimal HTTP/1.1 server supporting keep-alive connections.
+
+Usage:
+  python lineupService.py FantasyTeamPoints.xlsx [--port 8080] [--processes 2]
+  curl 'http://127.0.0.1:8080/optimize?sheet=Dec03Data&top=3'
+'''
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from cli import MODELS, player_summary, predictions, roster_names, set_model
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+LATENCY_WINDOW = 10000 # Latest requests kept per endpoint for percentiles
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    '''
+        An error to answer with an HTTP status other than 500.
+    '''
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+
+# ---------------------- LINEUP SERVICE OBJECT ------------------------
+class LineupService(object):
+    '''
+      DESCRIPTION:
+          The state and request handlers of the service.
+
+      ATTRIBUTES:
+          path: string path to the Excel workbook
+          processes: number of worker processes for lineup solves (1 solves
+                     in one worker thread of this process)
+          executor: the worker pool, while the service is running
+          metrics: dict of endpoint -> dict of request count, error count
+                   and a deque of the latest latencies in seconds
+          coalesced: number of optimize requests answered by another
+                     request's solve
+          solves: number of optimize solves run
+
+      FUNCTIONS:
+          __init__
+          start
+          close
+          serve_forever
+          handle
+          stats
+          predict
+          optimize
+          player
+          get_metrics
+    '''
+
+    def __init__(self, path, processes=1):
+        '''
+            Load every sheet of the workbook into memory (through the sheet
+            cache). Teams are made the first time a sheet is asked for.
+
+            @param: path, string path to the Excel workbook
+                    processes, int number of worker processes for solves
+                               (workers are spawned, so a script starting
+                               the service needs an if __name__ ==
+                               '__main__' guard)
+        '''
+        self.path = path
+        self.processes = processes
+        self.executor = None
+        self.routes = {'/stats': self.stats, '/predict': self.predict,
+                       '/optimize': self.optimize, '/player': self.player,
+                       '/metrics': self.get_metrics}
+        self.metrics = {route: {'requests': 0, 'errors': 0,
+                                'latency': deque(maxlen=LATENCY_WINDOW)}
+                        for route in self.routes}
+        self.coalesced = 0
+        self.solves = 0
+        self._pending = {} # Optimize request key -> future of the solve
+        self._server = None
+        _init_worker(path)
+
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        '''
+            Start the worker pool and listen for connections.
+
+            @param: host, string address to listen on
+                    port, int port to listen on (0 picks a free port)
+            @return: (host, port) the server is listening on
+        '''
+        if self.processes == 1:
+            self.executor = ThreadPoolExecutor(1) # Shares this process's Teams
+        else:
+            # Workers are spawned, not forked: forking a process that runs an
+            # event loop and pool threads can leave locks held in the child
+            self.executor = ProcessPoolExecutor(self.processes, get_context('spawn'),
+                                                initializer=_init_worker, initargs=(self.path,))
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        host, port = await self.start(host, port)
+        print("Serving {} on http://{}:{}".format(self.path, host, port))
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+
+    async def handle(self, method, target):
+        '''
+            Answer one request, and record its latency.
+
+            @param: method, string HTTP method
+                    target, string request target, ie. '/stats?sheet=Dec03Data'
+            @return: (status, result), an int HTTP status and a JSON-able dict
+        '''
+        start = time.perf_counter()
+        url = urlsplit(target)
+        route = url.path.rstrip('/') or '/'
+        handler = self.routes.get(route)
+        try:
+            if handler is None:
+                raise RequestError(404, "no endpoint {}".format(route))
+            if method != 'GET':
+                raise RequestError(405, "only GET is supported")
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            status, result = 200, await handler(query)
+        except RequestError as e:
+            status, result = e.status, {'error': str(e)}
+        except Exception as e:
+            status, result = 500, {'error': '{}: {}'.format(type(e).__name__, e)}
+
+        if handler is not None:
+            metrics = self.metrics[route]
+            metrics['requests'] += 1
+            metrics['errors'] += status != 200
+            metrics['latency'].append(time.perf_counter() - start)
+        return status, result
+
+
+    async def stats(self, query):
+        '''
+            @return: dict with the stats of every player, or of player=
+        '''
+        team = _get_team(_sheet(query), _model(query))
+        if 'player' in query:
+            return _player_info(team, query['player'])
+        return {'sheet': _sheet(query), 'players': [player_summary(p) for p in team.player_list]}
+
+
+    async def predict(self, query):
+        '''
+            @return: dict with every player's predicted points, highest
+                     first, and the whole team's total
+        '''
+        sheet, model = _sheet(query), _model(query)
+        team = _get_team(sheet, model)
+        return {'sheet': sheet, 'model': model,
+                'team_points': team.predict_team_next_points(), 'players': predictions(team)}
+
+
+    async def optimize(self, query):
+        '''
+            Solve in the worker pool. A request identical to one already
+            being solved waits for that solve instead of starting another.
+
+            @return: dict with the starting roster, its predicted points,
+                     and the next best rosters if top is more than 1
+        '''
+        key = (_sheet(query), _model(query), _int(query, 'top', 1))
+        future = self._pending.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, _optimize, *key)
+        self._pending[key] = future
+        self.solves += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+
+    async def player(self, query):
+        '''
+            @return: dict with one player's stats, from sheet= (default the
+                     latest sheet)
+        '''
+        if 'name' not in query:
+            raise RequestError(400, "give the player's name=")
+        return _player_info(_get_team(_sheet(query), _model(query)), query['name'])
+
+
+    async def get_metrics(self, query=None):
+        '''
+            @return: dict with the request count, error count and the p50
+                     and p99 latency (milliseconds) of each endpoint, plus
+                     the optimize solves run and requests coalesced
+        '''
+        endpoints = {}
+        for route, metrics in self.metrics.items():
+            latency = np.array(metrics['latency']) * 1000
+            p50, p99 = np.percentile(latency, [50, 99]) if len(latency) else (None, None)
+            endpoints[route] = {'requests': metrics['requests'], 'errors': metrics['errors'],
+                                'p50_ms': None if p50 is None else round(float(p50), 3),
+                                'p99_ms': None if p99 is None else round(float(p99), 3)}
+        return {'endpoints': endpoints, 'optimize_solves': self.solves,
+                'optimize_coalesced': self.coalesced, 'processes': self.processes}
+
+
+    async def _handle_connection(self, reader, writer):
+        '''
+            Serve the requests of one connection, one after another, until
+            the client closes it or asks to.
+        '''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if int(headers.get('content-length', 0) or 0):
+                    await reader.readexactly(int(headers['content-length']))
+
+                if len(parts) != 3:
+                    status, result, keep_alive = 400, {'error': 'bad request line'}, False
+                else:
+                    method, target, version = parts
+                    status, result = await self.handle(method, target)
+                    keep_alive = (version == 'HTTP/1.1' and
+                                  headers.get('connection', '').lower() != 'close')
+                writer.write(_response(status, result, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+
+def _response(status, result, keep_alive):
+    body = json.dumps(result, default=float).encode('utf-8')
+    head = ('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+            'Connection: {}\r\n\r\n').format(status, STATUS_TEXT.get(status, ''), len(body),
+                                             'keep-alive' if keep_alive else 'close')
+    return head.encode('latin-1') + body
+
+
+def _sheet(query):
+    store = _WORKER['store']
+    sheet = query.get('sheet', store.weeks[-1])
+    if sheet not in store.weeks:
+        raise RequestError(404, "no sheet {}".format(sheet))
+    return sheet
+
+
+def _model(query):
+    model = query.get('model', 'average')
+    if model not in MODELS:
+        raise RequestError(400, "model must be one of {}".format(', '.join(MODELS)))
+    return model
+
+
+def _int(query, key, default):
+    try:
+        return int(query.get(key, default))
+    except ValueError:
+        raise RequestError(400, "{} must be an integer".format(key))
+
+
+def _player_info(team, name):
+    p = team.get_player_by_name(name)
+    if p is None:
+        raise RequestError(404, "no player named {}".format(name))
+    return dict(player_summary(p), position_mask=int(p.table.pos_mask[p.row]))
+
+
+
+# Worker state: the season, and every Team made so far, by (sheet, model)
+_WORKER = {}
+
+
+def _init_worker(path):
+    from seasonStore import SeasonStore
+    _WORKER['path'] = path
+    _WORKER['store'] = SeasonStore.from_workbook(path)
+    _WORKER['teams'] = {}
+
+
+def _get_team(sheet, model):
+    '''
+        @return: the Team of a sheet with a prediction model, made the first
+                 time it is asked for and kept after that
+    '''
+    key = (sheet, model)
+    team = _WORKER['teams'].get(key)
+    if team is None:
+        store = _WORKER['store']
+        team = set_model(store.get_team(sheet), model, store, sheet)
+        _WORKER['teams'][key] = team
+    return team
+
+
+def _optimize(sheet, model, top):
+    '''
+        Solve a sheet's optimal starting roster (run in the worker pool).
+
+        @return: dict with the starting roster and its predicted points, and
+                 the top rosters if top is more than 1
+    '''
+    team = _get_team(sheet, model)
+    team.set_optimal_starting_roster()
+    result = {'sheet': sheet, 'model': model,
+              'predicted_points': team.predict_starting_roster_next_points(),
+              'starting_roster': roster_names(team.starting_roster)}
+    if top > 1:
+        result['top_rosters'] = [{'predicted_points': points, 'starting_roster': roster_names(roster)}
+                                 for points, roster in team.get_top_starting_rosters(top)]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='lineupService.py',
+                                     description='Local HTTP/JSON lineup service.')
+    parser.add_argument('workbook', help='path to the Excel workbook')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='number of worker processes for lineup solves')
+    args = parser.parse_args(argv)
+    service = LineupService(args.workbook, args.processes)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+
+# --------------- MAIN FUNCTION ------------------
+if __name__ == '__main__':
+    sys.exit(main())
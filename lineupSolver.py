@@ -0,0 +1,336 @@
+'''
+LINEUP SOLVER
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Encodes player positions as bitmasks.
+  2) Defines roster templates: the slots of a league's starting roster and
+     the positions that can fill each one, including flex slots such as F
+     (any forward) or UTIL (any skater). A template is compiled once into
+     one position bitmask per slot.
+  3) Builds a slot x player eligibility matrix for a starting roster.
+  4) Solves the lineup exactly as a maximum-weight assignment of players to
+     roster slots (Hungarian algorithm, shortest augmenting path form).
+  5) Finds the K best distinct lineups, best first.
+
+The solver runs in O(slots^2 * players) with the inner loop vectorized over
+players, so a full 12 slot roster over a pool of thousands of players solves
+in milliseconds, and players eligible at more than one position are handled
+naturally by the eligibility matrix. Flex slots are just slots with more
+than one position bit, so any template solves as fast as the default one.
+'''
+
+import heapq
+import numpy as np
+from instrumentation import count
+
+
+# Bit used for each position. A player's mask is the OR of their positions.
+POSITION_BITS = {'C': 1, 'L': 2, 'R': 4, 'D': 8, 'G': 16}
+
+# Positions that can fill each kind of slot, for slots given by name only
+SLOT_POSITIONS = {'C': 'C', 'L': 'L', 'R': 'R', 'D': 'D', 'G': 'G', 'F': 'CLR', 'UTIL': 'CLRD'}
+
+# The default starting roster: 2C, 2L, 2R, 4D, 2G
+DEFAULT_SLOT_COUNTS = [('C', 2), ('L', 2), ('R', 2), ('D', 4), ('G', 2)]
+
+
+
+# ---------------------- ROSTER TEMPLATE OBJECT ----------------------
+class RosterTemplate(object):
+    '''
+      DESCRIPTION:
+          The starting roster slots of a league, compiled once into the
+          position bitmask of every slot. A player can fill a slot if their
+          mask and the slot's mask share a bit.
+
+      ATTRIBUTES:
+          names: list of the slot names, in roster order (ie. ['C', 'L',
+                 'R', 'D', 'G', 'UTIL'])
+          counts: dict of slot name -> number of slots
+          positions: dict of slot name -> string of the positions that can
+                     fill it (ie. 'CLR')
+          slots: list of slot names, one per slot (ie. ['C', 'C', 'L', ...])
+          slot_masks: numpy int array of the position bitmask of each slot
+
+      FUNCTIONS:
+          __init__
+          from_slots
+          eligibility
+          __len__
+          __iter__
+          __getitem__
+          index
+          count
+    '''
+
+    def __init__(self, counts=DEFAULT_SLOT_COUNTS, positions=None):
+        '''
+            @param: counts, list of (slot name, number of slots), or a dict
+                    positions, none or a dict of slot name -> positions
+                               that can fill it (a string like 'CLR' or a
+                               list), for slots not in SLOT_POSITIONS or to
+                               override them
+        '''
+        counts = list(counts.items()) if isinstance(counts, dict) else list(counts)
+        positions = {} if positions is None else positions
+        self.names = [name for name, _ in counts]
+        assert len(set(self.names)) == len(self.names), "slot names must be unique"
+        self.counts = {name: int(n) for name, n in counts}
+        self.positions = {}
+        for name in self.names:
+            filled_by = positions.get(name, SLOT_POSITIONS.get(name))
+            assert filled_by is not None, "no positions given for slot {}".format(name)
+            assert all(p in POSITION_BITS for p in filled_by), "unknown position in slot {}".format(name)
+            self.positions[name] = ''.join(filled_by)
+        self.slots = [name for name in self.names for _ in range(self.counts[name])]
+        self.slot_masks = np.array([position_mask(self.positions[name]) for name in self.slots],
+                                   dtype=np.int64)
+
+
+    @classmethod
+    def from_slots(cls, slots):
+        '''
+            @param: slots, a RosterTemplate, or a list of slot names, one per
+                           slot (ie. ['C', 'C', 'L', ...])
+            @return: RosterTemplate
+        '''
+        if isinstance(slots, RosterTemplate):
+            return slots
+        names = sorted(set(slots), key=list(slots).index)
+        return cls([(name, list(slots).count(name)) for name in names])
+
+
+    def eligibility(self, player_masks):
+        '''
+            @param: player_masks, array-like of int position bitmasks
+            @return: numpy bool array of shape (slots, players)
+        '''
+        player_masks = np.asarray(player_masks, dtype=np.int64)
+        return (self.slot_masks[:, None] & player_masks[None, :]) != 0
+
+
+    # The template also works anywhere a list of slot names does
+    def __len__(self):
+        return len(self.slots)
+
+    def __iter__(self):
+        return iter(self.slots)
+
+    def __getitem__(self, i):
+        return self.slots[i]
+
+    def index(self, name):
+        return self.slots.index(name)
+
+    def count(self, name):
+        return self.counts.get(name, 0)
+
+
+
+def position_mask(positions):
+    '''
+        Convert a list of position strings into a single bitmask. Missing
+        positions (None, '' or nan from an empty Excel cell) are ignored.
+
+        @param: positions, list of strings such as ['C', 'R'] or ['D', nan]
+        @return: int bitmask
+    '''
+    mask = 0
+    for position in positions:
+        if isinstance(position, str) and position in POSITION_BITS:
+            mask |= POSITION_BITS[position]
+    return mask
+
+
+def eligibility_matrix(slots, player_masks):
+    '''
+        Build the boolean eligibility matrix of roster slots against players.
+
+        @param: slots, a RosterTemplate, or a list of slot names, one per
+                       roster slot (ie. ['C', 'C', 'L', 'L', ...])
+                player_masks, array-like of int position bitmasks, one per player
+        @return: numpy bool array of shape (len(slots), len(player_masks))
+    '''
+    return RosterTemplate.from_slots(slots).eligibility(player_masks)
+
+
+def solve_assignment(weights, eligible):
+    '''
+        Assign at most one player to every slot so that the number of filled
+        slots is as large as possible and, among those assignments, the sum
+        of player weights is maximal.
+
+        @param: weights, array-like of floats, one per player (nan counts as 0)
+                eligible, bool array of shape (slots, players)
+        @return: numpy int array with one player index per slot, or -1 where
+                 no eligible player is left for that slot
+    '''
+    eligible = np.asarray(eligible, dtype=bool)
+    n_slots, n_players = eligible.shape
+    weights = np.nan_to_num(np.asarray(weights, dtype=float))
+    count('lineup_solves')
+    if n_slots == 0:
+        return np.zeros(0, dtype=int)
+
+    # Minimize cost. An ineligible pairing costs more than any combination
+    # of real weights, so filling an extra slot always wins over points.
+    span = np.abs(weights).max() if n_players else 0.0
+    big = 2.0 * n_slots * span + 1.0
+    n_cols = max(n_players, n_slots) # pad with dummy players if needed
+    cost = np.full((n_slots, n_cols), big)
+    cost[:, :n_players] = np.where(eligible, -weights[None, :], big)
+
+    assignment = _hungarian(cost)
+    assignment[assignment >= n_players] = -1
+    filled = assignment >= 0
+    filled[filled] = eligible[np.flatnonzero(filled), assignment[filled]]
+    assignment[~filled] = -1
+    return assignment
+
+
+def solve_lineup(weights, player_masks, slots):
+    '''
+        Convenience wrapper: solve the assignment for a list of roster slots.
+
+        @param: weights, array-like of predicted points, one per player
+                player_masks, array-like of position bitmasks, one per player
+                slots, a RosterTemplate or a list of slot names
+        @return: numpy int array of player index per slot (-1 if unfilled)
+    '''
+    return solve_assignment(weights, eligibility_matrix(slots, player_masks))
+
+
+def top_k_lineups(weights, player_masks, slots, k):
+    '''
+        Find the k best lineups with distinct sets of players, best first.
+
+        Method:
+          1) Prune the pool. If a player has at least (slots - 1 + k) players
+             eligible at the same slot with a weight at least as high,
+             at least k of those are on the bench of any lineup using the
+             player there, and swapping each one in gives k lineups that are
+             as good. So only the top (slots - 1 + k) players of each
+             kind of slot can be in the k best lineups.
+          2) Branch and bound over the pruned pool (Lawler-Murty): each
+             popped lineup splits the remaining lineups into subproblems
+             that force some of its players in and one of them out. Every
+             subproblem is solved exactly with the assignment solver, so its
+             value is a tight bound and only the best subproblem is expanded.
+
+        @param: weights, array-like of predicted points, one per player
+                player_masks, array-like of position bitmasks, one per player
+                slots, a RosterTemplate or a list of slot names
+                k, int number of lineups
+        @return: list of up to k (total, assignment) tuples, best first, where
+                 assignment is a numpy array of player index per slot
+    '''
+    weights = np.nan_to_num(np.asarray(weights, dtype=float))
+    template = RosterTemplate.from_slots(slots)
+    eligible = template.eligibility(player_masks)
+
+    # 1) Prune to the top players of each kind of slot
+    keep = np.zeros(len(weights), dtype=bool)
+    depth = len(template) - 1 + k
+    for name in template.names:
+        players = np.flatnonzero(eligible[template.index(name)])
+        order = np.argsort(-weights[players], kind='stable')
+        keep[players[order[:depth]]] = True
+    pool = np.flatnonzero(keep)
+    pool_weights = weights[pool]
+    pool_eligible = eligible[:, pool]
+
+    # 2) Best-first search over subproblems (include, exclude)
+    root = _solve_constrained(pool_weights, pool_eligible, (), ())
+    filled = int((root >= 0).sum())
+    heap = [(-pool_weights[root[root >= 0]].sum(), 0, tuple(root), (), ())]
+    counter = 1
+    lineups = []
+    while heap and len(lineups) < k:
+        negative_total, _, assignment, include, exclude = heapq.heappop(heap)
+        assignment = np.array(assignment, dtype=int)
+        players = assignment.copy()
+        players[assignment >= 0] = pool[assignment[assignment >= 0]]
+        lineups.append((round(-negative_total, 2), players))
+
+        free = [i for i in assignment if i >= 0 and i not in include]
+        for j in range(len(free)):
+            child_include = include + tuple(free[:j])
+            child_exclude = exclude + (free[j],)
+            child = _solve_constrained(pool_weights, pool_eligible,
+                                       child_include, child_exclude)
+            used = child[child >= 0]
+            if len(used) < filled or not set(child_include) <= set(used):
+                continue # no lineup left in this subproblem
+            heapq.heappush(heap, (-pool_weights[used].sum(), counter, tuple(child),
+                                  child_include, child_exclude))
+            counter += 1
+    return lineups
+
+
+def _solve_constrained(weights, eligible, include, exclude):
+    '''
+        Solve the assignment with some players forced into the lineup and
+        some left out. Forced players get a bonus larger than any lineup,
+        which the solver's slot filling priority still outranks.
+    '''
+    weights = weights.copy()
+    eligible = eligible.copy()
+    if exclude:
+        eligible[:, list(exclude)] = False
+    if include:
+        weights[list(include)] += 2.0 * np.abs(weights).sum() + 1.0
+    return solve_assignment(weights, eligible)
+
+
+def _hungarian(cost):
+    '''
+        Rectangular Hungarian algorithm (rows <= columns), minimizing the total
+        cost. Each row is added with one shortest augmenting path search, and
+        every step of that search is a vectorized pass over the columns.
+
+        @param: cost, float array of shape (rows, columns)
+        @return: numpy int array, the column assigned to each row
+    '''
+    n_rows, n_cols = cost.shape
+    u = np.zeros(n_rows + 1)       # row potentials (1-based, 0 is a sentinel)
+    v = np.zeros(n_cols + 1)       # column potentials
+    p = np.zeros(n_cols + 1, dtype=int)   # row matched to each column
+    way = np.zeros(n_cols + 1, dtype=int) # previous column on the path
+
+    for i in range(1, n_rows + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(n_cols + 1, np.inf)
+        used = np.zeros(n_cols + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free[1:], minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+
+        # Flip the augmenting path
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = np.full(n_rows, -1, dtype=int)
+    matched = np.flatnonzero(p[1:])
+    assignment[p[1:][matched] - 1] = matched
+    return assignment
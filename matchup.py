@@ -0,0 +1,181 @@
+'''
+MATCHUP
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Turns every player's weekly points distribution into a discrete
+     probability mass function (pmf) on a grid of points.
+  2) Adds up a starting roster's players by convolution, with FFTs, to get
+     the exact (up to the grid) distribution of the roster's weekly total.
+  3) Gives the probability of winning a head-to-head matchup against an
+     opponent's starting roster.
+  4) Sets the starting roster with the best chance of winning the matchup,
+     comparing many candidate lineups in one batched FFT.
+
+The per game points of a player are modelled as in simulation.py, with a
+Gamma distribution (see fit_point_distributions), so a week of g games is
+Gamma(g * shape, scale). Unlike the simulation, no random draws are used:
+the answer is the same every time and takes milliseconds.
+'''
+
+import math
+import numpy as np
+from simulation import DEFAULT_CV, fit_point_distributions
+
+
+DEFAULT_STEP = 0.5   # points per grid bin
+TAIL_SDS = 8         # grid width past the mean, in standard deviations
+SUBSTEPS = 8         # pdf evaluations per bin
+
+
+def player_pmfs(table, rows, step=DEFAULT_STEP, cv=DEFAULT_CV):
+    '''
+        Discretize each player's weekly points distribution. Bin i holds the
+        probability of scoring i * step points, rounded to the grid.
+
+        @param: table, a PlayerTable
+                rows, list/array of row indices
+                step, float points per bin
+                cv, prior coefficient of variation of one game's points
+        @return: numpy array of shape (players, bins), each row summing to 1
+    '''
+    rows = np.asarray(rows, dtype=int)
+    shape, scale = fit_point_distributions(table, rows, cv)
+    week_shape = shape * table.get_column('predicted', 'games')[rows]
+    playing = week_shape > 0
+
+    mean = week_shape * scale
+    sd = np.sqrt(week_shape) * scale
+    top = np.max(mean + TAIL_SDS * sd, initial=0.0)
+    n_bins = max(int(np.ceil(top / step)), 1)
+
+    # Average the pdf over SUBSTEPS points of each bin, centred on i * step
+    x = (np.arange(n_bins * SUBSTEPS) + 0.5) * (step / SUBSTEPS) - step / 2
+    x[x <= 0] = np.nan
+    pmfs = np.zeros((len(rows), n_bins))
+    pmfs[:, 0] = 1.0 # Players who are not playing score 0
+    for i in np.flatnonzero(playing):
+        k, theta = week_shape[i], scale[i]
+        log_pdf = (k - 1) * np.log(x) - x / theta - math.lgamma(k) - k * math.log(theta)
+        mass = np.nan_to_num(np.exp(log_pdf)).reshape(n_bins, SUBSTEPS).sum(axis=1)
+        pmfs[i] = mass / mass.sum()
+    return pmfs
+
+
+def total_pmfs(pmfs, lineups):
+    '''
+        Distribution of the total points of many lineups at once. Each
+        lineup is a product of its players' spectra, and all lineups go
+        through one inverse FFT.
+
+        @param: pmfs, numpy array of shape (players, bins) from player_pmfs
+                lineups, int array of shape (lineups, players per lineup),
+                         rows of pmfs in each lineup
+        @return: numpy array of shape (lineups, total bins)
+    '''
+    lineups = np.atleast_2d(np.asarray(lineups, dtype=int))
+    n_bins = lineups.shape[1] * (pmfs.shape[1] - 1) + 1
+    size = 1 << int(np.ceil(np.log2(max(n_bins, 2))))
+    spectra = np.fft.rfft(pmfs, size, axis=1)
+    totals = np.fft.irfft(spectra[lineups].prod(axis=1), size, axis=1)[:, :n_bins]
+    totals = np.clip(totals, 0.0, None) # Remove FFT rounding noise
+    return totals / totals.sum(axis=1, keepdims=True)
+
+
+def roster_pmf(team, step=DEFAULT_STEP, cv=DEFAULT_CV):
+    '''
+        @param: team, a Team with a starting roster set
+                step, float points per bin
+                cv, prior coefficient of variation of one game's points
+        @return: numpy array, pmf of the starting roster's weekly total
+    '''
+    rows = team._get_rows(_starters(team))
+    assert rows is not None, "every starter must be a view of the Team's table"
+    pmfs = player_pmfs(team.table, rows, step, cv)
+    return total_pmfs(pmfs, [np.arange(len(rows))])[0]
+
+
+def win_probabilities(totals, opponent):
+    '''
+        Chance that each total beats the opponent's total. Totals in the
+        same bin count as a tie, and a tie counts as half a win.
+
+        @param: totals, numpy array of shape (lineups, bins) of pmfs
+                opponent, numpy array pmf, on the same grid step
+        @return: (win, tie), numpy arrays, one per lineup
+    '''
+    totals = np.atleast_2d(totals)
+    n_bins = max(totals.shape[1], len(opponent))
+    totals = np.pad(totals, ((0, 0), (0, n_bins - totals.shape[1])))
+    opponent = np.pad(opponent, (0, n_bins - len(opponent)))
+    below = np.concatenate([[0.0], np.cumsum(opponent)[:-1]]) # P(opponent in a lower bin)
+    win = totals @ below
+    tie = totals @ opponent
+    return win, tie
+
+
+def matchup(team, opponent, step=DEFAULT_STEP, cv=DEFAULT_CV):
+    '''
+        Probability of winning a head-to-head matchup with the current
+        starting rosters.
+
+        @param: team, opponent, Teams with starting rosters set
+                step, float points per bin
+                cv, prior coefficient of variation of one game's points
+        @return: dict of win, tie and loss probabilities (win includes half
+                 the ties) and each roster's expected points
+    '''
+    ours = roster_pmf(team, step, cv)
+    theirs = roster_pmf(opponent, step, cv)
+    win, tie = win_probabilities(ours, theirs)
+    return {'win': round(float(win[0] + tie[0] / 2), 4),
+            'tie': round(float(tie[0]), 4),
+            'loss': round(float(1 - win[0] - tie[0] / 2), 4),
+            'points': team.predict_starting_roster_next_points(),
+            'opponent_points': opponent.predict_starting_roster_next_points()}
+
+
+def set_matchup_starting_roster(team, opponent, k=50, step=DEFAULT_STEP, cv=DEFAULT_CV):
+    '''
+        Set the starting roster with the best chance of beating an opponent.
+        An underdog can win more often with a riskier lineup, and a
+        favourite with a safer one, even at fewer expected points.
+
+        Method:
+          The candidates are the k best lineups by expected points (see
+          Team.get_top_starting_rosters). Every player's pmf is transformed
+          once, each candidate total is a product of 12 spectra, and every
+          candidate is scored against the opponent in one batched pass.
+
+        @param: team, a Team
+                opponent, a Team with a starting roster set
+                k, int number of candidate lineups
+                step, float points per bin
+                cv, prior coefficient of variation of one game's points
+        @return: float probability of winning with the roster set (ties
+                 count as half)
+    '''
+    candidates = team.get_top_starting_rosters(k)
+    player_index = {p.row: i for i, p in enumerate(team.player_list)}
+    lineups = [[player_index[p.row] for position in roster.keys() for p in roster[position]]
+               for _, roster in candidates]
+    pmfs = player_pmfs(team.table, team._get_rows(team.player_list), step, cv)
+
+    # Lineups with an unfilled slot are padded with a player scoring 0
+    size = max(len(lineup) for lineup in lineups)
+    if any(len(lineup) < size for lineup in lineups):
+        nobody = np.zeros((1, pmfs.shape[1]))
+        nobody[0, 0] = 1.0
+        pmfs = np.vstack([pmfs, nobody])
+        lineups = [lineup + [len(pmfs) - 1] * (size - len(lineup)) for lineup in lineups]
+
+    win, tie = win_probabilities(total_pmfs(pmfs, lineups), roster_pmf(opponent, step, cv))
+    chances = win + tie / 2
+    best = int(np.argmax(chances))
+    team.starting_roster = candidates[best][1]
+    team._roster_is_optimal = (best == 0) # Best lineup by expected points
+    return round(float(chances[best]), 4)
+
+
+def _starters(team):
+    return [p for position in team.starting_roster.keys() for p in team.starting_roster[position]]
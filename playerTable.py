@@ -0,0 +1,248 @@
+'''
+PLAYER TABLE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Holds every player of a data sheet in contiguous NumPy columns.
+  2) Computes points per game and next week predictions for the whole
+     table in a single vectorized pass.
+
+A Player object (see teamBuilder.py) is a light view over one row of a
+PlayerTable, so whole-pool stats, predictions and sorts never have to walk
+Python objects.
+'''
+
+import sys
+import numpy as np
+from instrumentation import timed
+from lineupSolver import position_mask
+from predictionModels import AverageModel, points_per_game
+
+
+# Index of each time period and stat type in the 2D stat arrays
+PERIODS = ['predicted', 'last_week', 'total']
+STATS = ['pts', 'games', 'ppg']
+PERIOD_INDEX = {period: i for i, period in enumerate(PERIODS)}
+
+# Excel schema column -> (period, stat) it fills
+SHEET_COLUMNS = {'points_7': ('last_week', 'pts'),
+                 'games_7': ('last_week', 'games'),
+                 'points_total': ('total', 'pts'),
+                 'games_total': ('total', 'games'),
+                 'games_this_week': ('predicted', 'games')
+                 }
+
+
+# -------------------- PLAYER TABLE OBJECT ----------------------
+class PlayerTable(object):
+    '''
+      DESCRIPTION:
+          A PlayerTable holds the data of many players as columns, one row
+          per player, in the same order as the rows of the data sheet.
+
+      ATTRIBUTES:
+          names: object array of interned player name strings
+          position_1, position_2: object arrays of position strings ('' if
+                                  the player has no second position)
+          pos_mask: int array of position bitmasks (see lineupSolver)
+          team: object array of NHL team abbreviations ('' if unknown)
+          pts, games, ppg: arrays of shape (3, players), one row per time
+                           period in PERIODS (predicted, last_week, total)
+          model: the PredictionModel used for the predicted period
+          model_store, model_week: the SeasonStore and week given to the 
+                                   model, or None
+
+      FUNCTIONS:
+          __init__
+          __len__
+          from_records
+          get_column
+          get_positions
+          append_rows
+          set_row
+          calculate_stats
+          set_model
+          predict_next_points
+          sort_by
+    '''
+
+    def __init__(self, columns, stats=True):
+        '''
+            Build the table from a dictionary of sheet columns (name,
+            position_1, position_2, team, points_7, games_7, points_total,
+            games_total, games_this_week) and calculate all stats.
+
+            @param: columns, dict of column name -> array-like of values
+                    stats, False to leave calculate_stats to the caller
+            @return: none
+        '''
+        n = len(columns['name'])
+        self.names = np.array([sys.intern(str(x)) for x in columns['name']], dtype=object)
+        self.position_1 = _clean_strings(columns.get('position_1'), n)
+        self.position_2 = _clean_strings(columns.get('position_2'), n)
+        self.team = _clean_strings(columns.get('team'), n)
+        self.pos_mask = np.array([position_mask(pair) for pair in
+                                  zip(self.position_1, self.position_2)], dtype=np.int64)
+
+        self.model = AverageModel()
+        self.model_store = None
+        self.model_week = None
+
+        self.pts = np.zeros((len(PERIODS), n))
+        self.games = np.zeros((len(PERIODS), n), dtype=np.int64)
+        self.ppg = np.zeros((len(PERIODS), n))
+        for column, (period, stat) in SHEET_COLUMNS.items():
+            self.get_column(period, stat)[:] = np.asarray(columns[column])
+
+        if stats:
+            self.calculate_stats()
+
+
+    @classmethod
+    def from_records(cls, records):
+        '''
+            Build a table from a list of row dictionaries, ie. the output of
+            DataFrame.to_dict('records') or a single Player data dict.
+
+            @param: records, list of dicts in the Excel sheet schema
+            @return: PlayerTable
+        '''
+        keys = ['name', 'position_1', 'position_2', 'team'] + list(SHEET_COLUMNS.keys())
+        columns = {key: [r.get(key) for r in records] for key in keys}
+        return cls(columns)
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def get_column(self, time, stat):
+        '''
+            Access one stat of one time period for every player. This is a
+            view, so writing to it updates the table.
+
+            @param: time, a string in PERIODS
+                    stat, a string in STATS
+            @return: numpy array, one value per player
+        '''
+        return getattr(self, stat)[PERIOD_INDEX[time]]
+
+
+    def get_positions(self, row):
+        '''
+            @param: row, int index of a player
+            @return: list of the player's position strings
+        '''
+        return [x for x in (self.position_1[row], self.position_2[row]) if x]
+
+
+    def append_rows(self, records):
+        '''
+            Add players to the end of the table and calculate their stats
+            with the table's model. Existing rows keep their index, so Player
+            views of them stay valid.
+
+            @param: records, list of dicts in the Excel sheet schema
+            @return: numpy int array of the new rows
+        '''
+        new = PlayerTable.from_records(records)
+        start = len(self)
+        for column in ['names', 'position_1', 'position_2', 'team', 'pos_mask']:
+            setattr(self, column, np.concatenate([getattr(self, column), getattr(new, column)]))
+        for stat in STATS:
+            setattr(self, stat, np.concatenate([getattr(self, stat), getattr(new, stat)], axis=1))
+
+        rows = np.arange(start, len(self))
+        self.calculate_stats(rows)
+        return rows
+
+
+    def set_row(self, row, player_data):
+        '''
+            Overwrite the raw sheet values of one player and recalculate
+            that player's stats.
+
+            @param: row, int index of a player
+                    player_data, dict of sheet columns for that player
+            @return: none
+        '''
+        for column, (period, stat) in SHEET_COLUMNS.items():
+            if column in player_data:
+                self.get_column(period, stat)[row] = player_data[column]
+        self.calculate_stats([row])
+
+
+    @timed('calculate_stats')
+    def calculate_stats(self, rows=None):
+        '''
+            Vectorized version of the per-player stat calculation: ppg for the
+            total and last week periods, then predicted points and ppg for the
+            upcoming week. Players with no games get a ppg of 0.
+
+            @param: none, or a list/array of row indices to recalculate
+            @return: none
+        '''
+        index = slice(None) if rows is None else np.asarray(rows, dtype=int)
+        for period in ['last_week', 'total']:
+            p = PERIOD_INDEX[period]
+            self.ppg[p, index] = points_per_game(self.pts[p, index], self.games[p, index])
+
+        p = PERIOD_INDEX['predicted']
+        self.pts[p, index] = self.predict_next_points(rows)
+        self.ppg[p, index] = points_per_game(self.pts[p, index], self.games[p, index])
+
+
+    def set_model(self, model, store=None, week=None):
+        '''
+            Change the prediction model and recalculate the predicted period
+            of every player.
+
+            @param: model, a PredictionModel (see predictionModels.py)
+                    store, none or a SeasonStore with the players' history
+                    week, none (latest) or the store week the table is as of
+            @return: none
+        '''
+        self.model = model
+        self.model_store = store
+        self.model_week = week
+        self.calculate_stats()
+
+
+    @timed('predict_next_points')
+    def predict_next_points(self, rows=None):
+        '''
+            Predicted points for next week from the table's model. The default
+            AverageModel is the average of the overall and last week ppg, 
+            times the number of games to play next week.
+
+            @param: none, or a list/array of row indices
+            @return: numpy array of predicted points
+        '''
+        return self.model.predict(self, rows, self.model_store, self.model_week)
+
+
+    def sort_by(self, time='predicted', stat='pts', rows=None, reverse=True):
+        '''
+            Order rows by one stat column.
+
+            @param: time, stat, the column to sort on (default predicted pts)
+                    rows, none or an array of row indices to sort
+                    reverse, True for descending order (default)
+            @return: numpy array of row indices in sorted order
+        '''
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=int)
+        values = self.get_column(time, stat)[rows]
+        order = np.argsort(-values if reverse else values, kind='stable')
+        return rows[order]
+
+
+
+def _clean_strings(values, n):
+    '''
+        Convert a sheet column of strings into an object array, with empty
+        Excel cells (nan/None) as ''.
+    '''
+    if values is None:
+        return np.array([''] * n, dtype=object)
+    return np.array([sys.intern(str(x)) if isinstance(x, str) else '' for x in values],
+                    dtype=object)
@@ -0,0 +1,288 @@
+'''
+PREDICTION MODELS
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Predicts next week's fantasy points for a whole PlayerTable in one
+     array operation.
+  2) Pluggable models, all vectorized over players (and weeks):
+       - AverageModel: mean of the overall and last week ppg (the original
+         prediction)
+       - EwmaModel: exponentially weighted ppg across the weeks of a season
+       - RegressionModel: per-player least squares fit of weekly points
+         against games played
+  3) Predictions for every week of a SeasonStore at once, for backtesting.
+
+Every model estimates a points per game (ppg) rate, which is multiplied by
+the number of games to play next week. Swap the model of a team with
+Team.set_prediction_model; the Player objects are not rebuilt.
+'''
+
+import numpy as np
+
+
+# ------------------ PREDICTION MODEL OBJECTS --------------------
+class PredictionModel(object):
+    '''
+      DESCRIPTION:
+          Base class of the prediction models. A model needs to implement
+          estimate_ppg, and estimate_ppg_weeks if it can use a SeasonStore.
+
+      ATTRIBUTES:
+          uses_history: True if the model gives better estimates when given
+                        the SeasonStore history
+
+      FUNCTIONS:
+          estimate_ppg
+          estimate_ppg_weeks
+          predict
+          predict_weeks
+    '''
+    uses_history = False
+
+    def estimate_ppg(self, table, index):
+        '''
+            Estimate next week's ppg from the table alone.
+
+            @param: table, a PlayerTable
+                    index, a slice or int array of rows
+            @return: numpy array of ppg estimates
+        '''
+        raise NotImplementedError
+
+    def estimate_ppg_weeks(self, store, through=None):
+        '''
+            Estimate next week's ppg as of every week of a season.
+
+            @param: store, a SeasonStore
+                    through, none or the last week to estimate
+            @return: numpy array of shape (weeks, store players), nan where
+                     there is not enough data yet
+        '''
+        raise NotImplementedError
+
+    def predict(self, table, rows=None, store=None, week=None):
+        '''
+            Predict next week's points for every player of a table.
+
+            @param: table, a PlayerTable
+                    rows, none for all rows, or a list/array of row indices
+                    store, none or a SeasonStore with the players' history
+                    week, none (latest) or the store week the table is as of
+            @return: numpy array of predicted points, one per row
+        '''
+        index = slice(None) if rows is None else np.asarray(rows, dtype=int)
+        ppg = np.array(self.estimate_ppg(table, index), dtype=float)
+        if store is not None and self.uses_history:
+            history = self.estimate_ppg_weeks(store, week)[-1]
+            columns = store.get_player_columns(table.names[index])
+            known = np.flatnonzero(columns >= 0)
+            from_history = history[columns[known]]
+            use = ~np.isnan(from_history)
+            ppg[known[use]] = from_history[use]
+        games = table.games[_PREDICTED, index]
+        return round_half(ppg * games)
+
+    def predict_weeks(self, store, through=None):
+        '''
+            Predicted points for the upcoming week, as of every week of a
+            season, for every player. Absent players are 0. Like predict,
+            players without enough history fall back to the estimate from
+            that week's table.
+
+            @param: store, a SeasonStore
+                    through, none or the last week to predict from
+            @return: numpy array of shape (weeks, store players)
+        '''
+        ppg = np.array(self.estimate_ppg_weeks(store, through), dtype=float)
+        present = store.get_present(through)
+        for t in np.flatnonzero((np.isnan(ppg) & present).any(axis=1)):
+            table = store.get_table(t)
+            columns = store.get_player_columns(table.names)
+            missing = np.isnan(ppg[t, columns])
+            ppg[t, columns[missing]] = self.estimate_ppg(table, slice(None))[missing]
+        games = store.get_history('games_this_week', through)
+        return round_half(np.nan_to_num(ppg) * games * present)
+
+
+
+class AverageModel(PredictionModel):
+    '''
+      DESCRIPTION:
+          The original prediction: the average of the overall ppg and last
+          week's ppg.
+    '''
+
+    def estimate_ppg(self, table, index):
+        return (table.ppg[_TOTAL, index] + table.ppg[_LAST_WEEK, index]) / 2
+
+    def estimate_ppg_weeks(self, store, through=None):
+        total = points_per_game(store.get_history('points_total', through),
+                                store.get_history('games_total', through))
+        last_week = points_per_game(store.get_history('points_7', through),
+                                    store.get_history('games_7', through))
+        return (total + last_week) / 2
+
+
+
+class EwmaModel(PredictionModel):
+    '''
+      DESCRIPTION:
+          Exponentially weighted average of each week's ppg. Recent weeks
+          count more: week t-k gets a weight of alpha * (1 - alpha)^k.
+          Without a season history, the table's before-last-week ppg and last
+          week ppg are used as the only two weeks.
+
+      ATTRIBUTES:
+          alpha: weight of the most recent week, between 0 and 1
+    '''
+    uses_history = True
+
+    def __init__(self, alpha=0.5):
+        assert 0 < alpha <= 1, "alpha must be in (0, 1]"
+        self.alpha = alpha
+
+    def estimate_ppg(self, table, index):
+        games_before = table.games[_TOTAL, index] - table.games[_LAST_WEEK, index]
+        pts_before = table.pts[_TOTAL, index] - table.pts[_LAST_WEEK, index]
+        before = points_per_game(pts_before, games_before)
+        last_week = table.ppg[_LAST_WEEK, index]
+        played = table.games[_LAST_WEEK, index] > 0
+        return np.where(played, self.alpha * last_week + (1 - self.alpha) * before, before)
+
+    def estimate_ppg_weeks(self, store, through=None):
+        games = store.get_history('games_7', through)
+        played = store.get_present(through) & (games > 0)
+        ppg = points_per_game(store.get_history('points_7', through), games)
+
+        # One vectorized step per week over all players
+        estimate = np.full(games.shape, np.nan)
+        current = np.full(games.shape[1], np.nan)
+        for t in range(games.shape[0]):
+            update = np.where(np.isnan(current), ppg[t],
+                              self.alpha * ppg[t] + (1 - self.alpha) * current)
+            current = np.where(played[t], update, current)
+            estimate[t] = current
+        return estimate
+
+
+
+class RegressionModel(PredictionModel):
+    '''
+      DESCRIPTION:
+          Per-player least squares fit of weekly points = a + b * games, over
+          all the weeks seen so far. Weeks with few games (back to backs,
+          injuries) are then predicted by their game count rather than an
+          average rate. Falls back to total points / total games until a
+          player has min_weeks weeks with at least two different weekly game
+          counts. Without a season history, the overall ppg is used.
+
+      ATTRIBUTES:
+          min_weeks: weeks of data needed before the line is fitted
+    '''
+    uses_history = True
+
+    def __init__(self, min_weeks=4):
+        assert min_weeks >= 2, "a line needs at least 2 weeks"
+        self.min_weeks = min_weeks
+
+    def estimate_ppg(self, table, index):
+        return table.ppg[_TOTAL, index]
+
+    def predict(self, table, rows=None, store=None, week=None):
+        '''
+            Same as PredictionModel.predict, but evaluates the fitted line
+            at next week's number of games, instead of a rate times games.
+        '''
+        if store is None:
+            return PredictionModel.predict(self, table, rows)
+        index = slice(None) if rows is None else np.asarray(rows, dtype=int)
+        games = table.games[_PREDICTED, index]
+        predicted = round_half(self.estimate_ppg(table, index) * games)
+
+        a, b = (fit[-1] for fit in self.fit_weeks(store, week))
+        columns = store.get_player_columns(table.names[index])
+        known = np.flatnonzero(columns >= 0)
+        line = a[columns[known]] + b[columns[known]] * games[known]
+        use = ~np.isnan(line)
+        predicted[known[use]] = round_half(line[use])
+        predicted[games == 0] = 0
+        return predicted
+
+    def predict_weeks(self, store, through=None):
+        a, b = self.fit_weeks(store, through)
+        games = store.get_history('games_this_week', through)
+        line = np.nan_to_num(a + b * games) * (games > 0)
+        return round_half(line * store.get_present(through))
+
+    def estimate_ppg_weeks(self, store, through=None):
+        a, b = self.fit_weeks(store, through)
+        games = store.get_history('games_this_week', through)
+        return np.where(games > 0, (a + b * games) / np.maximum(games, 1), b)
+
+    def fit_weeks(self, store, through=None):
+        '''
+            Fit the line for every player as of every week, using running
+            sums along the week axis.
+
+            @param: store, a SeasonStore
+                    through, none or the last week to fit
+            @return: (a, b), numpy arrays of shape (weeks, store players)
+        '''
+        games = store.get_history('games_7', through).astype(float)
+        points = store.get_history('points_7', through) * store.get_present(through)
+        seen = store.get_present(through).astype(float)
+
+        n = np.cumsum(seen, axis=0)
+        sum_g = np.cumsum(games, axis=0)
+        sum_p = np.cumsum(points, axis=0)
+        sum_gg = np.cumsum(games * games, axis=0)
+        sum_gp = np.cumsum(games * points, axis=0)
+
+        denominator = n * sum_gg - sum_g * sum_g
+        fitted = (denominator > 1e-9) & (n >= self.min_weeks)
+        slope = np.divide(n * sum_gp - sum_g * sum_p, denominator,
+                          out=np.zeros(games.shape), where=fitted)
+        rate = points_per_game(sum_p, sum_g)
+        b = np.where(fitted, slope, rate)
+        a = np.divide(sum_p - b * sum_g, n, out=np.zeros(games.shape), where=fitted)
+        b[n == 0] = np.nan
+        return a, b
+
+
+
+# Row of each period in the PlayerTable arrays (see playerTable.PERIODS)
+_PREDICTED, _LAST_WEEK, _TOTAL = 0, 1, 2
+
+
+def points_per_game(pts, games):
+    '''
+        Rounded points per game, 0 where no games were played.
+
+        @param: pts, games, array-likes of the same shape
+        @return: numpy float array
+    '''
+    pts = np.asarray(pts, dtype=float)
+    ppg = np.divide(pts, games, out=np.zeros(pts.shape), where=(np.asarray(games) != 0))
+    return round_half(ppg)
+
+
+def round_half(values, decimals=2):
+    '''
+        Vectorized equivalent of Python's round(x, decimals). np.round scales
+        by 10**decimals first, which can land exactly on a .5 tie that the
+        true decimal value does not; only those ties are redone exactly.
+
+        @param: values, array-like of floats
+                decimals, int number of decimals (default 2)
+        @return: numpy float array
+    '''
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, decimals)
+    scaled = values * 10**decimals
+    ties = np.flatnonzero(np.abs(scaled - np.trunc(scaled)) == 0.5)
+    if len(ties):
+        flat = rounded.reshape(-1)
+        for i in ties:
+            flat[i] = round(float(values.flat[i]), decimals)
+    return rounded
@@ -0,0 +1,331 @@
+'''
+SEASON STORE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Merges all the weekly datasheets into one continuous set: a
+     (week x player) array for every column of the sheet schema.
+  2) Appends a new week without touching the weeks already stored, both in
+     memory and in a saved store folder.
+  3) Builds a PlayerTable or Team "as of" any stored week in O(players).
+  4) Gives whole-season history arrays for trend calculations.
+'''
+
+import os
+import json
+import numpy as np
+from playerTable import PlayerTable
+from sheetCache import read_sheet, warm_cache
+
+
+# Numeric columns of the sheet schema and the dtype they are stored with
+WEEK_COLUMNS = {'games_7': np.int64,
+                'points_7': np.float64,
+                'games_total': np.int64,
+                'points_total': np.float64,
+                'games_this_week': np.int64
+                }
+POSITION_CODES = ['', 'C', 'L', 'R', 'D', 'G']
+META_FILE = 'season.json'
+
+
+# -------------------- SEASON STORE OBJECT ----------------------
+class SeasonStore(object):
+    '''
+      DESCRIPTION:
+          A SeasonStore holds every weekly sheet of a season in arrays
+          indexed by (week, player). Players keep the same column for the
+          whole season, and a player missing from a week is marked as not
+          present that week.
+
+      ATTRIBUTES:
+          weeks: list of week labels (sheet names) in season order
+          names: list of player names, one per player column
+          teams: list of NHL team strings, indexed by the team codes
+          data: dict of column name -> array of shape (week capacity,
+                player capacity), for each column in WEEK_COLUMNS
+          position_1, position_2: int8 arrays of codes into POSITION_CODES
+          team: int16 arrays of codes into teams
+          sheet_row: int32 array, row of the player in that week's sheet,
+                     or -1 if the player was not on the sheet that week
+
+      FUNCTIONS:
+          __init__
+          from_workbook
+          load
+          save
+          append_week
+          get_week_index
+          get_player_columns
+          get_columns
+          get_table
+          get_team
+          get_history
+          get_present
+    '''
+
+    def __init__(self):
+        self.weeks = []
+        self.names = []
+        self.teams = ['']
+        self._player_index = {}
+        self._team_index = {'': 0}
+        self._saved_weeks = 0
+        self._allocate(4, 32)
+
+
+    @classmethod
+    def from_workbook(cls, path, cache_dir=None):
+        '''
+            Build a store from every sheet of a workbook, in workbook order.
+            Sheets are read through the sheet cache.
+
+            @param: path, string path to the Excel workbook
+                    cache_dir, none or a string path to the cache folder
+            @return: SeasonStore
+        '''
+        store = cls()
+        for sheet in warm_cache(path, cache_dir):
+            store.append_week(sheet, read_sheet(path, sheet, cache_dir))
+        return store
+
+
+    @classmethod
+    def load(cls, folder):
+        '''
+            Load a store written by save().
+
+            @param: folder, string path to the store folder
+            @return: SeasonStore
+        '''
+        with open(os.path.join(folder, META_FILE)) as f:
+            meta = json.load(f)
+
+        store = cls()
+        store.names = meta['names']
+        store.teams = meta['teams']
+        store._player_index = {name: i for i, name in enumerate(store.names)}
+        store._team_index = {team: i for i, team in enumerate(store.teams)}
+        store._allocate(max(len(meta['weeks']), 4), max(len(store.names), 32))
+        for w, week in enumerate(meta['weeks']):
+            with np.load(os.path.join(folder, _week_file(w))) as saved:
+                n = len(saved['sheet_row']) # Later players stay absent
+                for column, values in store._week_arrays().items():
+                    values[w, :n] = saved[column]
+            store.weeks.append(week)
+        store._saved_weeks = len(store.weeks)
+        return store
+
+
+    def save(self, folder):
+        '''
+            Save the store to a folder, one file per week. Weeks that are
+            already in the folder are not rewritten, so saving after
+            append_week only writes the new week.
+
+            @param: folder, string path to the store folder
+            @return: none
+        '''
+        os.makedirs(folder, exist_ok=True)
+        meta_path = os.path.join(folder, META_FILE)
+        if self._saved_weeks and not os.path.exists(meta_path):
+            self._saved_weeks = 0 # A new folder, write everything
+
+        n = len(self.names)
+        for w in range(self._saved_weeks, len(self.weeks)):
+            np.savez(os.path.join(folder, _week_file(w)),
+                     **{column: values[w, :n] for column, values in
+                        self._week_arrays().items()})
+
+        tmp = meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'weeks': self.weeks, 'names': self.names,
+                       'teams': self.teams}, f)
+        os.replace(tmp, meta_path)
+        self._saved_weeks = len(self.weeks)
+
+
+    def append_week(self, week, columns):
+        '''
+            Add one weekly sheet to the end of the season. Only the new week's
+            row of each array is written; the arrays are reallocated (doubling
+            in size) only when they run out of room.
+
+            @param: week, string label of the week (ie. the sheet name)
+                    columns, dict of sheet column name -> array-like, as given
+                             by sheetCache.read_sheet
+            @return: int index of the new week
+        '''
+        assert week not in self.weeks, "week already in the store"
+        names = [str(name) for name in columns['name']]
+        assert len(set(names)) == len(names), "player more than once in the week"
+        players = [self._add_player(name) for name in names]
+        w = len(self.weeks)
+        self._allocate(w + 1, len(self.names))
+
+        players = np.array(players, dtype=int)
+        for column, dtype in WEEK_COLUMNS.items():
+            self.data[column][w, players] = np.asarray(columns[column], dtype=dtype)
+        self.position_1[w, players] = _position_codes(columns.get('position_1'), len(players))
+        self.position_2[w, players] = _position_codes(columns.get('position_2'), len(players))
+        if 'team' in columns:
+            self.team[w, players] = [self._add_team(t) for t in columns['team']]
+        self.sheet_row[w, players] = np.arange(len(players))
+
+        self.weeks.append(week)
+        return w
+
+
+    def get_week_index(self, week):
+        '''
+            @param: week, a week label or an int index (negative counts back
+                    from the latest week)
+            @return: int index of the week
+        '''
+        if isinstance(week, str):
+            return self.weeks.index(week)
+        return range(len(self.weeks))[week]
+
+
+    def get_player_columns(self, names):
+        '''
+            @param: names, iterable of player names
+            @return: numpy int array of each player's column, -1 if unknown
+        '''
+        return np.array([self._player_index.get(str(name), -1) for name in names],
+                        dtype=int)
+
+
+    def get_columns(self, week=-1):
+        '''
+            Sheet columns of the players present in a week, in their order on
+            that week's sheet.
+
+            @param: week, label or index of the week (default latest)
+            @return: dict of column name -> numpy array
+        '''
+        w = self.get_week_index(week)
+        n = len(self.names)
+        present = np.flatnonzero(self.sheet_row[w, :n] >= 0)
+        players = np.full(len(present), -1, dtype=int)
+        players[self.sheet_row[w, present]] = present # sheet order in O(players)
+
+        columns = {column: self.data[column][w, players] for column in WEEK_COLUMNS}
+        codes = np.array(POSITION_CODES, dtype=object)
+        columns['name'] = np.array(self.names, dtype=object)[players]
+        columns['position_1'] = codes[self.position_1[w, players]]
+        columns['position_2'] = codes[self.position_2[w, players]]
+        columns['team'] = np.array(self.teams, dtype=object)[self.team[w, players]]
+        return columns
+
+
+    def get_table(self, week=-1):
+        '''
+            @param: week, label or index of the week (default latest)
+            @return: PlayerTable of the players on that week's sheet
+        '''
+        return PlayerTable(self.get_columns(week))
+
+
+    def get_team(self, week=-1):
+        '''
+            @param: week, label or index of the week (default latest)
+            @return: Team as it was on that week's sheet
+        '''
+        from teamBuilder import Team
+        return Team(table=self.get_table(week))
+
+
+    def get_history(self, column, through=None):
+        '''
+            The stored values of one column for every week and player. This
+            is a view of the store, so do not write to it.
+
+            @param: column, a string in WEEK_COLUMNS
+                    through, none for all weeks, or the label or index of the
+                             last week to include
+            @return: numpy array of shape (weeks, players), 0 where absent
+        '''
+        last = len(self.weeks) if through is None else self.get_week_index(through) + 1
+        return self.data[column][:last, :len(self.names)]
+
+
+    def get_present(self, through=None):
+        '''
+            @param: through, none or the last week to include
+            @return: bool array of shape (weeks, players), True where the
+                     player was on that week's sheet
+        '''
+        last = len(self.weeks) if through is None else self.get_week_index(through) + 1
+        return self.sheet_row[:last, :len(self.names)] >= 0
+
+
+
+    def _week_arrays(self):
+        arrays = dict(self.data)
+        arrays.update({'position_1': self.position_1, 'position_2': self.position_2,
+                       'team': self.team, 'sheet_row': self.sheet_row})
+        return arrays
+
+
+    def _allocate(self, n_weeks, n_players):
+        '''
+            Make sure the arrays have room for n_weeks x n_players, doubling
+            the capacity of whichever axis is too small.
+        '''
+        if hasattr(self, 'sheet_row'):
+            capacity = self.sheet_row.shape
+            if n_weeks <= capacity[0] and n_players <= capacity[1]:
+                return
+            shape = (_grow(capacity[0], n_weeks), _grow(capacity[1], n_players))
+        else:
+            shape = (n_weeks, n_players)
+            self.data = {column: None for column in WEEK_COLUMNS}
+            self.position_1 = self.position_2 = self.team = self.sheet_row = None
+
+        def resize(old, dtype, fill=0):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:old.shape[0], :old.shape[1]] = old
+            return new
+
+        for column, dtype in WEEK_COLUMNS.items():
+            self.data[column] = resize(self.data[column], dtype)
+        self.position_1 = resize(self.position_1, np.int8)
+        self.position_2 = resize(self.position_2, np.int8)
+        self.team = resize(self.team, np.int16)
+        self.sheet_row = resize(self.sheet_row, np.int32, fill=-1)
+
+
+    def _add_player(self, name):
+        name = str(name)
+        if name not in self._player_index:
+            self._player_index[name] = len(self.names)
+            self.names.append(name)
+        return self._player_index[name]
+
+
+    def _add_team(self, team):
+        team = str(team) if isinstance(team, str) else ''
+        if team not in self._team_index:
+            self._team_index[team] = len(self.teams)
+            self.teams.append(team)
+        return self._team_index[team]
+
+
+
+def _grow(capacity, needed):
+    while capacity < needed:
+        capacity *= 2
+    return capacity
+
+
+def _position_codes(values, n):
+    if values is None:
+        return np.zeros(n, dtype=np.int8)
+    return np.array([POSITION_CODES.index(x) if isinstance(x, str) and x in POSITION_CODES
+                     else 0 for x in values], dtype=np.int8)
+
+
+def _week_file(index):
+    return 'week_{:03d}.npz'.format(index)
@@ -0,0 +1,262 @@
+'''
+SHEET CACHE
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Converts each sheet of the Excel workbook, once, into a folder of
+     binary NumPy column files (.npy) that can be memory-mapped.
+  2) Reuses the cached columns on later runs for as long as the workbook
+     is unchanged (same size and mtime, or failing that the same SHA-1).
+  3) Pre-warms every sheet of a workbook in a single Excel parse, and
+     remembers the workbook's sheet names, so a warm cache never needs
+     pandas.
+  4) Counts cache hits and misses.
+
+Cache folders live in a '.sheet_cache' folder next to the workbook unless
+another cache_dir is given. Delete that folder to clear the cache.
+'''
+
+import os
+import json
+import hashlib
+import numpy as np
+
+
+CACHE_DIR_NAME = '.sheet_cache'
+META_FILE = 'meta.json'
+CACHE_VERSION = 1
+
+
+# --------------------- CACHE STATS OBJECT ------------------------
+class CacheStats(object):
+    '''
+      DESCRIPTION:
+          Running count of cache lookups since import (or the last reset).
+
+      ATTRIBUTES:
+          hits: number of sheets read from the binary cache
+          misses: number of sheets that had to be parsed from Excel
+
+      FUNCTIONS:
+          __init__
+          __str__
+          reset
+    '''
+
+    def __init__(self):
+        self.reset()
+
+    def __str__(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return 'sheet cache: {} hits, {} misses ({:.0f}% hit rate)'.format(
+                self.hits, self.misses, rate)
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+
+CACHE_STATS = CacheStats()
+
+
+def get_cache_stats():
+    '''
+        @return: the module's CacheStats object
+    '''
+    return CACHE_STATS
+
+
+def read_sheet(path, sheet, cache_dir=None):
+    '''
+        Return the columns of one sheet, from the binary cache if it is up
+        to date with the workbook, otherwise parsing the workbook and
+        caching the sheet for next time.
+
+        @param: path, string path to the Excel workbook
+                sheet, string name of the sheet
+                cache_dir, none (default folder next to the workbook) or a
+                           string path to the cache folder
+        @return: dict of column name -> read-only, memory-mapped numpy array
+    '''
+    folder = _sheet_folder(path, sheet, cache_dir)
+    workbook = _workbook_info(path)
+    if _is_fresh(folder, workbook):
+        CACHE_STATS.hits += 1
+        return _load_columns(folder)
+
+    CACHE_STATS.misses += 1
+    import pandas as pd
+    df = pd.read_excel(path, sheet_name=sheet)
+    _write_columns(folder, sheet, df, _with_hash(path, workbook))
+    return _load_columns(folder)
+
+
+def warm_cache(path, cache_dir=None):
+    '''
+        Open a workbook once and write the cache for every sheet that is
+        missing or out of date. If the workbook is unchanged since its sheet
+        names were stored and every sheet is cached, pandas is not imported,
+        and the workbook is only read to compare hashes if its mtime changed.
+
+        @param: path, string path to the Excel workbook
+                cache_dir, none or a string path to the cache folder
+        @return: list of the workbook's sheet names, in workbook order
+    '''
+    workbook = _workbook_info(path)
+    sheets_path = _sheets_file(path, cache_dir)
+    sheets, workbook = _read_sheet_names(sheets_path, workbook)
+    if sheets is not None and all(_is_fresh(_sheet_folder(path, sheet, cache_dir), workbook)
+                                  for sheet in sheets):
+        CACHE_STATS.hits += len(sheets)
+        return sheets
+
+    if 'sha1' not in workbook:
+        workbook = _with_hash(path, workbook)
+    import pandas as pd
+    with pd.ExcelFile(path) as excel: # Workbook is opened only once
+        for sheet in excel.sheet_names:
+            folder = _sheet_folder(path, sheet, cache_dir)
+            if _is_fresh(folder, workbook):
+                CACHE_STATS.hits += 1
+            else:
+                CACHE_STATS.misses += 1
+                _write_columns(folder, sheet, excel.parse(sheet), workbook)
+        sheets = list(excel.sheet_names)
+    meta = dict(workbook)
+    meta.update({'version': CACHE_VERSION, 'sheets': sheets})
+    _write_json(sheets_path, meta)
+    return sheets
+
+
+
+def _sheet_folder(path, sheet, cache_dir):
+    '''
+        Cache folder of one sheet, keyed by absolute workbook path and sheet.
+    '''
+    return os.path.join(*_cache_key(path, cache_dir)) + '_' + sheet
+
+
+def _sheets_file(path, cache_dir):
+    '''
+        File with the sheet names of a workbook, next to its sheet folders.
+    '''
+    return os.path.join(*_cache_key(path, cache_dir)) + '.json'
+
+
+def _cache_key(path, cache_dir):
+    path = os.path.abspath(path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(path), CACHE_DIR_NAME)
+    return cache_dir, hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+
+
+def _read_sheet_names(sheets_path, workbook):
+    '''
+        The stored sheet names, if they were listed from the same workbook,
+        checked the same way as a sheet folder (see _is_fresh).
+
+        @return: (sheet names or none, workbook info, with its SHA-1 if the
+                 workbook had to be hashed)
+    '''
+    try:
+        with open(sheets_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None, workbook
+    if meta.get('version') != CACHE_VERSION or meta['size'] != workbook['size']:
+        return None, workbook
+    if meta['mtime_ns'] == workbook['mtime_ns']:
+        return meta['sheets'], workbook
+
+    workbook = _with_hash(workbook['path'], workbook)
+    if meta['sha1'] != workbook['sha1']:
+        return None, workbook
+    meta['mtime_ns'] = workbook['mtime_ns']
+    _write_json(sheets_path, meta)
+    return meta['sheets'], workbook
+
+
+def _workbook_info(path):
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns}
+
+
+def _with_hash(path, workbook):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    info = dict(workbook)
+    info['sha1'] = sha1.hexdigest()
+    return info
+
+
+def _is_fresh(folder, workbook):
+    '''
+        A cache folder is fresh if it was written from a workbook with the
+        same size and mtime. If only the mtime changed (ie. the file was
+        copied or touched), compare hashes and refresh the stored mtime.
+    '''
+    meta_path = os.path.join(folder, META_FILE)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('version') != CACHE_VERSION or meta['size'] != workbook['size']:
+        return False
+    if meta['mtime_ns'] == workbook['mtime_ns']:
+        return True
+
+    sha1 = workbook['sha1'] if 'sha1' in workbook else _with_hash(workbook['path'], workbook)['sha1']
+    if meta['sha1'] != sha1:
+        return False
+    meta['mtime_ns'] = workbook['mtime_ns']
+    _write_json(meta_path, meta)
+    return True
+
+
+def _write_columns(folder, sheet, df, workbook):
+    '''
+        Save each column of a DataFrame as a .npy file. Text columns become
+        fixed width unicode arrays (empty cells as ''), so that every column
+        can be memory-mapped. meta.json is written last, so a folder is only
+        used once it is complete.
+    '''
+    os.makedirs(folder, exist_ok=True)
+    meta_path = os.path.join(folder, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype.kind not in 'biuf':
+            values = np.array(['' if x is None or x != x else str(x) for x in values],
+                              dtype=str)
+        np.save(os.path.join(folder, _column_file(i)), values)
+        columns.append(str(column))
+
+    meta = dict(workbook)
+    meta.update({'version': CACHE_VERSION, 'sheet': sheet, 'columns': columns})
+    _write_json(meta_path, meta)
+
+
+def _load_columns(folder):
+    with open(os.path.join(folder, META_FILE)) as f:
+        meta = json.load(f)
+    return {column: np.load(os.path.join(folder, _column_file(i)), mmap_mode='r')
+            for i, column in enumerate(meta['columns'])}
+
+
+def _column_file(index):
+    return 'column_{}.npy'.format(index)
+
+
+def _write_json(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
@@ -0,0 +1,219 @@
+'''
+SIMULATION
+Part of FantasyTeamBuilder (https://github.com/macwilson/FantasyTeamBuilder)
+
+Main Functionality:
+  1) Fits a per game fantasy points distribution to every player from their
+     total and last week stats.
+  2) Simulates many weeks of points for a starting roster in one batched
+     NumPy draw, and reports the mean, percentiles and the probability of
+     beating a target.
+  3) Sets the starting roster that maximizes a percentile of the weekly
+     total (ie. the 25th percentile for a safe lineup), instead of the mean.
+
+Per game points are modelled with a Gamma distribution (never negative,
+right skewed). Its mean is the player's predicted ppg. Its variance is the
+average of a prior spread (coefficient of variation cv) and the spread
+implied by the gap between last week's ppg and the overall ppg. The sum of
+g games of Gamma(k, theta) is Gamma(g * k, theta), so a whole week for
+every starter is one draw per player per simulation.
+'''
+
+import numpy as np
+from lineupSolver import position_mask
+
+
+DEFAULT_SIMULATIONS = 100000
+DEFAULT_CV = 0.9 # Typical spread of one game's fantasy points
+
+
+# ------------------- SIMULATION RESULT OBJECT ---------------------
+class SimulationResult(object):
+    '''
+      DESCRIPTION:
+          The simulated weekly point totals of a starting roster.
+
+      ATTRIBUTES:
+          totals: numpy array of the simulated weekly totals
+          names: list of the simulated players' names
+
+      FUNCTIONS:
+          __init__
+          mean
+          percentile
+          probability_above
+          summary
+          print_summary
+    '''
+
+    def __init__(self, totals, names):
+        self.totals = totals
+        self.names = names
+
+    def mean(self):
+        return round(float(self.totals.mean()), 2)
+
+    def percentile(self, q):
+        '''
+            @param: q, float or list of percentiles between 0 and 100
+            @return: float, or numpy array if q is a list
+        '''
+        return np.round(np.percentile(self.totals, q), 2)
+
+    def probability_above(self, target):
+        '''
+            @param: target, float number of points
+            @return: float, the fraction of simulated weeks above target
+        '''
+        return float(np.mean(self.totals > target))
+
+    def summary(self, percentiles=(5, 25, 50, 75, 95), target=None):
+        '''
+            @param: percentiles, tuple of percentiles to report
+                    target, none or a points target
+            @return: dict with the number of simulations, mean, std, the
+                     percentiles and the probability of beating the target
+        '''
+        result = {'simulations': len(self.totals),
+                  'mean': self.mean(),
+                  'std': round(float(self.totals.std()), 2)}
+        for q, value in zip(percentiles, self.percentile(list(percentiles))):
+            result['p{}'.format(q)] = float(value)
+        if target is not None:
+            result['p_above_{}'.format(target)] = self.probability_above(target)
+        return result
+
+    def print_summary(self, target=None):
+        print("\nSimulated Roster Points:")
+        for key, value in self.summary(target=target).items():
+            print('{:16} {}'.format(key, value))
+
+
+
+def fit_point_distributions(table, rows=None, cv=DEFAULT_CV):
+    '''
+        Fit the Gamma distribution of one game's points for each player.
+
+        @param: table, a PlayerTable
+                rows, none or a list/array of row indices
+                cv, prior coefficient of variation of one game's points
+        @return: (shape, scale), numpy arrays of the per game Gamma shape and
+                 scale, shape is 0 for players expected to score nothing
+    '''
+    index = slice(None) if rows is None else np.asarray(rows, dtype=int)
+    games = table.get_column('predicted', 'games')[index]
+    mean = np.divide(table.get_column('predicted', 'pts')[index], games,
+                     out=np.zeros(len(games)), where=games > 0)
+    gap = table.get_column('last_week', 'ppg')[index] - table.get_column('total', 'ppg')[index]
+    observed = table.get_column('last_week', 'games')[index] * gap**2
+    variance = ((cv * mean)**2 + observed) / 2
+
+    scoring = (mean > 0) & (variance > 0)
+    shape = np.divide(mean**2, variance, out=np.zeros(len(mean)), where=scoring)
+    scale = np.divide(variance, mean, out=np.ones(len(mean)), where=scoring)
+    return shape, scale
+
+
+def simulate_player_points(table, rows=None, n_sims=DEFAULT_SIMULATIONS, seed=None,
+                           cv=DEFAULT_CV):
+    '''
+        Simulate next week's total points of each player.
+
+        @param: table, a PlayerTable
+                rows, none or a list/array of row indices
+                n_sims, int number of simulated weeks
+                seed, none or an int seed for repeatable results
+                cv, prior coefficient of variation of one game's points
+        @return: numpy array of shape (n_sims, players)
+    '''
+    index = slice(None) if rows is None else np.asarray(rows, dtype=int)
+    shape, scale = fit_point_distributions(table, rows, cv)
+    week_shape = shape * table.get_column('predicted', 'games')[index]
+    playing = week_shape > 0
+
+    points = np.zeros((n_sims, len(shape)))
+    rng = np.random.default_rng(seed)
+    points[:, playing] = rng.gamma(week_shape[playing], scale[playing],
+                                   size=(n_sims, int(playing.sum())))
+    return points
+
+
+def simulate_starting_roster(team, n_sims=DEFAULT_SIMULATIONS, seed=None, cv=DEFAULT_CV):
+    '''
+        Simulate the weekly points of a Team's current starting roster.
+
+        @param: team, a Team with a starting roster set
+                n_sims, int number of simulated weeks
+                seed, none or an int seed
+                cv, prior coefficient of variation of one game's points
+        @return: SimulationResult
+    '''
+    starters = [p for position in team.starting_roster.keys()
+                for p in team.starting_roster[position]]
+    rows = team._get_rows(starters)
+    # None would simulate the whole table instead of the roster
+    assert rows is not None, "every starter must be a view of the Team's table"
+    points = simulate_player_points(team.table, rows, n_sims, seed, cv)
+    return SimulationResult(points.sum(axis=1), [p.get_name() for p in starters])
+
+
+def set_percentile_starting_roster(team, q=25, n_sims=20000, seed=0, cv=DEFAULT_CV):
+    '''
+        Set the starting roster that maximizes the q-th percentile of the
+        weekly total, rather than its mean.
+
+        Method:
+          Simulate every player on the team once (the same simulated weeks
+          are reused for every lineup compared), start from the lineup with
+          the best mean, then keep making the single bench-for-starter swap
+          that most improves the percentile until no swap improves it. Every
+          candidate swap at a slot is scored in one vectorized pass.
+
+        @param: team, a Team
+                q, float percentile to maximize (0 to 100)
+                n_sims, int number of simulated weeks
+                seed, none or an int seed
+                cv, prior coefficient of variation of one game's points
+        @return: SimulationResult of the chosen roster
+    '''
+    team.set_optimal_starting_roster()
+    rows = team._get_rows(team.player_list)
+    points = simulate_player_points(team.table, rows, n_sims, seed, cv)
+    masks = team.table.pos_mask[rows]
+    player_index = {p.row: i for i, p in enumerate(team.player_list)}
+
+    slot_masks = {name: position_mask(team.template.positions[name])
+                  for name in team.template.names}
+
+    # Lineup as (slot name, index into player_list)
+    lineup = [(position, player_index[p.row]) for position in team.starting_roster.keys()
+              for p in team.starting_roster[position]]
+    totals = points[:, [i for _, i in lineup]].sum(axis=1)
+    best = np.percentile(totals, q)
+
+    improved = True
+    while improved:
+        improved = False
+        starting = set(i for _, i in lineup)
+        for slot, (position, out) in enumerate(lineup):
+            bench = [i for i in range(len(rows)) if i not in starting and
+                     masks[i] & slot_masks[position]]
+            if not bench:
+                continue
+            candidates = totals[:, None] - points[:, [out]] + points[:, bench]
+            scores = np.percentile(candidates, q, axis=0)
+            pick = int(np.argmax(scores))
+            if scores[pick] > best + 1e-9:
+                best = scores[pick]
+                totals = candidates[:, pick]
+                starting.discard(out)
+                starting.add(bench[pick])
+                lineup[slot] = (position, bench[pick])
+                improved = True
+
+    roster = {position: [] for position in team.starting_roster.keys()}
+    for position, i in lineup:
+        roster[position].append(team.player_list[i])
+    team.starting_roster = roster
+    team._roster_is_optimal = False # Best percentile, not best mean
+    return SimulationResult(totals, [team.player_list[i].get_name() for _, i in lineup])
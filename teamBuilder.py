@@ -12,15 +12,18 @@ Main Functionality:
 
 Functionality to add:
   - Eventually change this all to do it by scraping the website for the point data.
-  - Migrate data to a database?
-  - Merge all datasheets into one continuous set + add object functionality for this
-      - columns "total_games, total_pts, last_wk_games, last_wk_pts, games_this_wk"
 '''
 
-import pandas as pd 
-import matplotlib.pyplot as plt 
 import numpy as np 
-from itertools import combinations
+from instrumentation import span, timed
+from lineupSolver import POSITION_BITS, RosterTemplate, solve_assignment, top_k_lineups
+from playerTable import PlayerTable, PERIODS, STATS, PERIOD_INDEX
+from sheetCache import read_sheet
+
+
+# The default starting roster, 2C, 2L, 2R, 4D, 2G, and its slot positions
+DEFAULT_TEMPLATE = RosterTemplate()
+STARTING_SLOTS = DEFAULT_TEMPLATE.slots
 
 
 # ----------------------- PLAYER OBJECT -------------------------
@@ -37,6 +40,8 @@ class Player(object):
           stats: a nested dictionary of points per game (ppg), total points 
                  (pts), and number of games (games), separated by time period 
                  (last week [last_week], next week [predicted], or overall)
+          table: the PlayerTable holding the player's data
+          row: the index of the player's row in the table
           
           
       FUNCTIONS:
@@ -52,17 +57,38 @@ class Player(object):
           predict_player_next_points
     '''
 
-    def __init__(self, d):
-        # Identity info
-        self.name = d['name']
-        self.position = [d['position_1'], d['position_2']]
-        self.stats = {'predicted': {'pts': 0, 'games': 0, 'ppg': 0},
-                      'last_week': {'pts': 0, 'games': 0, 'ppg': 0},
-                      'total': {'pts': 0, 'games': 0, 'ppg': 0}
-                      }
-        self.calculate_player_stats(d) #Fill in the stats dictionary
+    def __init__(self, d=None, table=None, row=0):
+        '''
+            A Player is a view over one row of a PlayerTable. It can be made
+            from a row of Excel data (d), which gets its own one-row table, or
+            pointed at a row of an existing table shared with a Team.
+            
+            @param: d, a dictionary of one row of Excel data, or none
+                    table, a PlayerTable, or none
+                    row, int index of the player within the table
+        '''
+        if table is None:
+            table = PlayerTable.from_records([d]) #Fills in the stats as well
+            row = 0
+        self.table = table
+        self.row = row
         
 
+    @property
+    def name(self):
+        return self.table.names[self.row]
+    
+    @property
+    def position(self):
+        return self.table.get_positions(self.row)
+    
+    @property
+    def stats(self):
+        '''
+            Nested dictionary snapshot of the player's row in the table.
+        '''
+        return {time: self.get_stats(time) for time in PERIODS}
+
     def get_name(self):
         '''
             Access and return the player's name as string.
@@ -74,10 +100,10 @@ class Player(object):
             Access and return the player's positions as list of strings
         '''
         
-        return [x for x in self.position if str(x) != 'nan']
+        return self.position
     
     def get_prediction(self):
-        return self.stats['predicted']['pts']
+        return self.table.pts[PERIOD_INDEX['predicted'], self.row].item()
     
     def get_stats(self, time=None, stat=None): 
         '''
@@ -92,21 +118,17 @@ class Player(object):
         '''
 
         if time is not None:
-            pass
             if stat is not None:
                 # Return a single stat type for 1 time point
-                return self.stats[time][stat] #float
+                return self.table.get_column(time, stat)[self.row].item() #float
             
             else:
                 # Return range of stats for certain time
-                return self.stats[time] #dict
+                return {s: self.get_stats(time, s) for s in STATS} #dict
             
         elif stat is not None: 
             # Return a range of stats of the same type
-            return {'predicted': self.stats['predicted'][stat], 
-                      'last_week': self.stats['last_week'][stat],
-                      'total': self.stats['total'][stat]
-                    }
+            return {t: self.get_stats(t, stat) for t in PERIODS}
         
         # ELSE: Return the whole dict, stat==None & time ==None
         return self.stats #nested dict
@@ -116,35 +138,15 @@ class Player(object):
         '''
             Get points per game, total points, and number of games for time 
             periods of the total season up until now, the previous week, as
-            well as the upcoming week. This includes making a call to the 
-            prediction function that will predict how many points the player
-            is expected to score in the upcoming week. Set all these to the
-            self.stats nested dictionary attribute. 
+            well as the upcoming week. This includes the prediction of how 
+            many points the player is expected to score in the upcoming week.
+            Set all these to the player's row of the table. 
             
             @param: player_data, a dictionary representing one row of data from
                     the Excel file containing all player data
             @return: none
         '''
-        # Last week stats
-        points_last_week = player_data['points_7']
-        games_last_week = player_data['games_7']
-        self.stats['last_week']['pts'] = points_last_week
-        self.stats['last_week']['games'] = games_last_week
-        self.stats['last_week']['ppg'] = round(points_last_week/games_last_week,2)
-        
-        # Overall stats
-        games_total = player_data['games_total'] #Eventually change this to total
-        points_total = player_data['points_total'] #Eventually change to points_total
-        self.stats['total']['pts'] = points_total
-        self.stats['total']['games'] = games_total
-        self.stats['total']['ppg'] = round(points_total/games_total, 2) 
-        
-        # Predicted stats -> Call to predict_player_next_points()
-        games_this_week = player_data['games_this_week']
-        self.stats['predicted']['games'] = games_this_week
-        points_this_week = self.predict_player_next_points()
-        self.stats['predicted']['pts'] = points_this_week
-        self.stats['predicted']['ppg'] = round(points_this_week/games_this_week, 2)
+        self.table.set_row(self.row, player_data)
         
        
     
@@ -154,13 +156,14 @@ class Player(object):
         '''
         
         # table heading
+        stats = self.stats
         print('{:8} {:8} {:10} {:10}'.format("stat", "total", "last_wk", "next_wk_predict"))
-        for stat in list(self.stats['total'].keys()):
+        for stat in list(stats['total'].keys()):
             print('{:8} {:<8} {:<10} {:<10}'.format(
                     stat, #stat name
-                    self.stats['total'][stat],
-                    self.stats['last_week'][stat],
-                    self.stats['predicted'][stat]
+                    stats['total'][stat],
+                    stats['last_week'][stat],
+                    stats['predicted'][stat]
                     ))
         
     
@@ -174,42 +177,34 @@ class Player(object):
         self.print_player_stats()
         
     
-    def plot_player_stats(self): # DEPRECATED -> CHANGE
+    def plot_player_stats(self, store=None, path=None):
         '''
-           Plot the progression of points per game, and total points, over time
-           and predicted. Data points should be:
+           Plot the progression of total points, and points per game, over 
+           every week of the season so far, then the prediction for next week. 
+           Without a season history, the data points are:
                1. Total before last week
                2. Total including last week
                3. Predicted after this week
+           
+           @param: store, none (the SeasonStore of the prediction model, if 
+                          any) or a SeasonStore with the player's history
+                   path, none to show the plot, or a file path to save it to
+                         without opening a window
+           @return: none
         '''
-        # Set the variables to plot
-        time = ['before', 'last week', 'upcoming week']
-        x = [0,1,2]
-        pts_before = self.get_stats('total', 'pts') - self.get_stats('last_week', 'pts')
-        ppg_before = pts_before / (self.get_stats('total', 'games') - self.get_stats('last_week', 'games'))
-        pts_array = [pts_before, self.get_stats('total', 'pts'), self.get_stats('total','pts') + self.get_stats('predicted', 'pts')]
-        ppg_array = [ppg_before, self.get_stats('last_week', 'ppg'), self.get_stats('predicted', 'ppg')]
-        
-        # Create the figure
-        fig = plt.figure(1)
-        fig.suptitle(self.get_name(), fontsize=16)
+        from chartReport import player_series, draw_player_chart
+        series = player_series(self, store)
         
-        # Subplot 1, total points
-        plt.subplot(211)
-        plt.xticks(x, time)
-        plt.plot(x, pts_array, 'r', label='total points')
-        plt.xlabel('Time Period')
-        plt.ylabel('Total Points')
-        plt.ylim(bottom=0, top=(max(pts_array) + 0.25*max(pts_array)))
-        
-        # Subplot 2, points per game
-        plt.subplot(212)
-        plt.xticks(x, time)
-        plt.plot(x, ppg_array, 'b', label='points per game')
-        plt.xlabel('Time Period')
-        plt.ylabel('Points Per Game')
-        plt.ylim(bottom=0, top=(max(ppg_array) + 0.25*max(ppg_array)))
+        if path is not None:
+            from matplotlib.figure import Figure # No window needed
+            fig = Figure(figsize=(8, 6))
+            draw_player_chart(fig, series)
+            fig.savefig(path)
+            return
         
+        import matplotlib.pyplot as plt # Only loaded when plotting
+        fig = plt.figure(1)
+        draw_player_chart(fig, series)
         plt.show()
         
         
@@ -224,10 +219,7 @@ class Player(object):
             
             @return: float
         '''
-        return round( ((self.stats['total']['ppg'] + 
-                         self.stats['last_week']['ppg'] )/2 ) 
-                         * self.stats['predicted']['games'], 2
-                      )
+        return self.table.predict_next_points([self.row])[0].item()
  
 
 
@@ -238,9 +230,16 @@ class Team(object):
         A Team object is a specified collection of Player objects.
   
     ATTRIBUTES:
-        player_list: a list of all Player objects on the team.
+        player_list: a list of all Player objects on the team. Change it 
+                     with add_player, remove_player and trade_player, which 
+                     keep the lookup indexes up to date.
+        table: the PlayerTable holding the data of every player on the team,
+               which the Player objects are views of.
         starting_roster: a dict of all positions and the Player objects set to 
                         play that position.
+        template: the RosterTemplate of the league's starting roster slots,
+                  so the starting_roster keys are its slot names (ie. 'F'
+                  or 'UTIL' as well as positions).
                     
     FUNCTIONS:
         __init__
@@ -251,27 +250,59 @@ class Team(object):
         print_starting_roster_stats
         get_player_by_name
         get_players_by_position
+        add_player
+        remove_player
+        trade_player
+        update_player_games
+        update_player_prediction
+        _reoptimize
+        _linked_positions
+        _is_starter
+        _build_indexes
+        _update_position_index
+        set_prediction_model
+        _get_rows
         set_optimal_starting_roster
+        get_top_starting_rosters
+        _make_roster
         set_random_starting_roster
         predict_team_next_points
         predict_starting_roster_next_points
   '''
   
-  def __init__(self, path, sheet):
+  def __init__(self, path=None, sheet=None, table=None, rows=None, template=None):
     '''
       Instantiate a Team object. Player list gets imported, but starting 
       roster starts as unset - needs to be manually set later. 
       
       @param: path, a string indicating the path to the Excel sheet data
+              sheet, a string naming the sheet in the Excel file
+              table, an already loaded PlayerTable to use instead of a 
+                     path and sheet (ie. from a SeasonStore)
+              rows, none for every row of the table, or the rows of the 
+                    table that are on this Team (ie. in a League)
+              template, none (DEFAULT_TEMPLATE) or a RosterTemplate of the
+                        league's starting roster slots
       @return: none
     '''
-    self.player_list = self.create_team(path, sheet) 
-    self.starting_roster = {'C': [], 'L': [], 'R': [], 'D': [], 'G': []}
-
-
+    if table is None:
+        self.player_list = self.create_team(path, sheet) 
+    else:
+        self.table = table
+        rows = range(len(table)) if rows is None else rows
+        self.player_list = [Player(table=table, row=int(i)) for i in rows]
+    self.template = DEFAULT_TEMPLATE if template is None else template
+    self.starting_roster = {name: [] for name in self.template.names}
+    self._roster_is_optimal = False
+    self._build_indexes()
+
+
+  @timed('create_team')
   def create_team(self, path, sheet):
     '''
-      For each player in the data file, make a player object.  
+      Load the data file into one PlayerTable, and make a Player object 
+      viewing each row of it. The sheet is only parsed from Excel the first
+      time, after that it is read from the sheet cache (see sheetCache.py).
       
       @param: string, path to excel file 
       @return: players, list of Player objects
@@ -279,11 +310,16 @@ class Team(object):
     assert path != None, "path not provided"
     assert sheet != None, "sheet not provided"
     
-    df = pd.read_excel(path, sheetname=sheet) # Newer version is sheet_name
-    df_as_dict = df.to_dict('records')
-    players = []
-    for i in range(len(df_as_dict)):
-      players.append(Player(df_as_dict[i])) 
+    with span('create_team.read_sheet'):
+      columns = read_sheet(path, sheet) # Cached binary copy of the sheet
+    with span('create_team.player_table'):
+      self.table = PlayerTable(columns, stats=False)
+    with span('create_team.calculate_stats'):
+      self.table.calculate_stats()
+    with span('create_team.players'):
+      players = []
+      for i in range(len(self.table)):
+        players.append(Player(table=self.table, row=i)) 
 
     return players 
 
@@ -376,28 +412,257 @@ class Team(object):
       @param: a string, a player name
       @return: a Player object with the designated name, or 'None" if none found
     '''
-    for p in self.player_list:
-      assert type(name) is str, "get_player_by_name takes one string input"
-      if name == p.name: 
-        return p
+    assert isinstance(name, str), "get_player_by_name takes one string input"
     
-    return None
+    return self._name_index.get(name)
 
 
   def get_players_by_position(self, position):
     '''
-      Return a list of all Player objects that play that position.
+      Return all Player objects that play that position, from the position 
+      index. Players with two positions are in both. 
       
       @param: string, either 'C', 'L', 'R', 'G', or 'D'
-      @return: list of Player objects 
+      @return: tuple of Player objects (shared with the index, not a copy)
     '''
     assert position in ['C', 'L', 'R', 'G', 'D'], "position is not valid"
-    result = []
-    for p in self.player_list: 
-      if position in p.position: 
-        result.append(p)
     
-    return result
+    return self._position_index[position]
+
+
+  def add_player(self, player_data):
+    '''
+      Add a player to the Team, ie. a waiver pickup. If the roster was 
+      optimal, it is updated incrementally in case they should start.
+      
+      @param: player_data, a dictionary of one row of data in the Excel schema
+      @return: the new Player object
+    '''
+    assert player_data['name'] not in self._name_index, "player already on team"
+    row = self.table.append_rows([player_data])[0]
+    player = Player(table=self.table, row=row)
+    self.player_list.append(player)
+    self._name_index[player.get_name()] = player
+    self._rows = np.append(self._rows, row)
+    self._eligible = np.hstack([self._eligible, 
+                                self.template.eligibility(self.table.pos_mask[[row]])])
+    self._update_position_index(player)
+    self._reoptimize(player, -np.inf)
+    
+    return player
+
+
+  def remove_player(self, name):
+    '''
+      Remove a player from the Team (and the starting roster, if there). 
+      Their row stays in the table, so other Player objects are unaffected.
+      If the roster was optimal, their replacement is found incrementally.
+      
+      @param: name, a string, the player name
+      @return: the removed Player object
+    '''
+    player = self.get_player_by_name(name)
+    assert player is not None, "player not on team"
+    index = self.player_list.index(player)
+    del self.player_list[index]
+    del self._name_index[name]
+    self._rows = np.delete(self._rows, index)
+    self._eligible = np.delete(self._eligible, index, axis=1)
+    self._update_position_index(player)
+    was_starter = self._is_starter(player)
+    for position in self.starting_roster.keys():
+        if player in self.starting_roster[position]:
+            self.starting_roster[position] = [p for p in self.starting_roster[position] 
+                                              if p is not player]
+    if was_starter:
+        self._reoptimize(player, player.get_prediction(), removed=True)
+    
+    return player
+
+
+  def trade_player(self, name, player_data):
+    '''
+      Swap a player on the Team for a new one.
+      
+      @param: name, a string, the player leaving
+              player_data, a dictionary of Excel data of the player joining
+      @return: the new Player object
+    '''
+    self.remove_player(name)
+    
+    return self.add_player(player_data)
+
+
+  def update_player_games(self, name, games):
+    '''
+      Change how many games a player has next week (ie. a postponed game or
+      a late scratch), recalculate their prediction and, if the roster was 
+      optimal, update it incrementally.
+      
+      @param: name, a string, the player name
+              games, int number of games next week
+      @return: none
+    '''
+    player = self.get_player_by_name(name)
+    assert player is not None, "player not on team"
+    old_points = player.get_prediction()
+    self.table.set_row(player.row, {'games_this_week': games})
+    self._reoptimize(player, old_points)
+
+
+  def update_player_prediction(self, name, points):
+    '''
+      Override a player's predicted points for next week (ie. 0 for an 
+      injury) and, if the roster was optimal, update it incrementally. The
+      override lasts until the player's stats are recalculated.
+      
+      @param: name, a string, the player name
+              points, float predicted points
+      @return: none
+    '''
+    player = self.get_player_by_name(name)
+    assert player is not None, "player not on team"
+    old_points = player.get_prediction()
+    games = player.get_stats('predicted', 'games')
+    self.table.get_column('predicted', 'pts')[player.row] = points
+    self.table.get_column('predicted', 'ppg')[player.row] = round(points / games, 2) if games else 0.0
+    self._reoptimize(player, old_points)
+
+
+  def _reoptimize(self, player, old_points, removed=False):
+    '''
+      Keep an optimal starting roster optimal after one player's predicted
+      points change (or they join or leave the Team), re-solving as little
+      as possible. The result has the same predicted points as a full
+      set_optimal_starting_roster.
+      
+      Method:
+        1) Nothing changes if a starter got better, or a bench player got 
+           worse: no other lineup can have gained more than this one.
+        2) Otherwise, only the positions linked to the player's positions
+           by dual-eligible players and flex slots are re-solved (ie. C/L/R,
+           but not D or G for a forward), using just the top players of 
+           each position.
+      
+      @param: player, the Player that changed
+              old_points, float, their predicted points before the change
+                          (-inf for a player just added)
+              removed, True if the player just left the Team
+      @return: none
+    '''
+    if not self._roster_is_optimal:
+        return
+    if not removed:
+        new_points = player.get_prediction()
+        starter = self._is_starter(player)
+        if (starter and new_points >= old_points) or (not starter and new_points <= old_points):
+            return
+    
+    linked = self._linked_positions(self.table.pos_mask[player.row])
+    slot_rows = np.flatnonzero(self.template.slot_masks & linked)
+    if len(slot_rows) == 0:
+        return
+    rows = self._get_rows(self.player_list)
+    weights = self.table.get_column('predicted', 'pts')[rows]
+    masks = self.table.pos_mask[rows]
+    
+    # Only the top len(slot_rows) players of each position can start
+    keep = np.zeros(len(rows), dtype=bool)
+    for position, bit in POSITION_BITS.items():
+        if linked & bit:
+            plays = np.flatnonzero(masks & bit)
+            keep[plays[np.argsort(-weights[plays], kind='stable')[:len(slot_rows)]]] = True
+    candidates = np.flatnonzero(keep)
+    
+    assignment = solve_assignment(weights[candidates], 
+                                  self._eligible[np.ix_(slot_rows, candidates)])
+    filled = assignment >= 0
+    assignment[filled] = candidates[assignment[filled]]
+    # Every slot of a name has the same positions, so all or none are solved
+    names = [name for name in self.template.names if self.template.index(name) in slot_rows]
+    solved = RosterTemplate([(name, self.template.counts[name]) for name in names],
+                            self.template.positions)
+    roster = self._make_roster(assignment, solved)
+    for name in names:
+        self.starting_roster[name] = roster[name]
+
+
+  def _linked_positions(self, mask):
+    '''
+      The positions of a mask, plus every position connected to them 
+      through players on the Team eligible at more than one position, or
+      slots of the template that more than one position can fill.
+      
+      @param: mask, int position bitmask
+      @return: int bitmask of the linked positions
+    '''
+    linked = mask
+    team_masks = np.unique(np.concatenate([self.table.pos_mask[self._rows], 
+                                           self.template.slot_masks]))
+    changed = True
+    while changed:
+        changed = False
+        for m in team_masks:
+            if m & linked and (m | linked) != linked:
+                linked |= m
+                changed = True
+    
+    return int(linked)
+
+
+  def _is_starter(self, player):
+    return any(player in self.starting_roster[position] for position in self.starting_roster.keys())
+
+
+  def _build_indexes(self):
+    '''
+      Build the name index, the table rows of player_list, the position
+      index (from the position bitmasks) of the whole Team, and the slot x
+      player eligibility matrix of the roster template.
+      
+      @param: none
+      @return: none
+    '''
+    self._name_index = {}
+    for p in self.player_list:
+        self._name_index.setdefault(p.get_name(), p)
+    self._rows = np.array([p.row for p in self.player_list], dtype=int)
+    masks = self.table.pos_mask[self._rows]
+    self._eligible = self.template.eligibility(masks)
+    self._position_index = {}
+    for position, bit in POSITION_BITS.items():
+        self._position_index[position] = tuple(self.player_list[i] for i in 
+                                               np.flatnonzero(masks & bit))
+
+
+  def _update_position_index(self, player):
+    '''
+      Refresh the position index entries of the positions a player plays.
+      
+      @param: a Player object that was just added or removed
+      @return: none
+    '''
+    mask = self.table.pos_mask[player.row]
+    for position, bit in POSITION_BITS.items():
+        if mask & bit:
+            self._position_index[position] = tuple(p for p in self.player_list if 
+                                                   self.table.pos_mask[p.row] & bit)
+
+
+  def set_prediction_model(self, model, store=None, week=None):
+    '''
+      Change how next week's points are predicted for every player on the 
+      Team. The Player objects stay the same and see the new predictions.
+      The starting roster is not changed, set it again afterwards.
+      
+      @param: model, a PredictionModel (see predictionModels.py)
+              store, none or a SeasonStore, for models that use the weekly
+                     history (EwmaModel, RegressionModel)
+              week, none (latest) or the store week the Team is as of
+      @return: none
+    '''
+    self.table.set_model(model, store, week)
+    self._roster_is_optimal = False
 
 
   def predict_team_next_points(self, sub_list=None):
@@ -410,134 +675,133 @@ class Team(object):
     list_to_use = sub_list
     if sub_list is None:
         list_to_use = self.player_list
-    total_points = 0
     for p in list_to_use:
         assert type(p) == Player, "predict_team_next_points takes a list of Player objects"
-        total_points = total_points + p.get_prediction()
+    
+    rows = self._get_rows(list_to_use)
+    if rows is None:
+        # Players from other tables, sum them one by one
+        total_points = sum(p.get_prediction() for p in list_to_use)
+    else:
+        total_points = self.table.get_column('predicted', 'pts')[rows].sum()
         
-    return round(total_points, 2)
+    return round(float(total_points), 2)
 
   def predict_starting_roster_next_points(self):
     '''
       Sum the predicted points of the starting roster.
       
-      @param: noneaallaa
+      @param: none
       @return: total_points, float
     '''
-    total_points = 0
-
+    starters = []
     for position in self.starting_roster.keys():
-        for player in self.starting_roster[position]:
-            total_points = total_points + player.get_prediction()
+        starters.extend(self.starting_roster[position])
     
-    return round(total_points, 2)
+    return self.predict_team_next_points(sub_list=starters)
 
 
+  @timed('set_optimal_starting_roster')
   def set_optimal_starting_roster(self):
     '''
       Determine the combination of players that leads to the highest team score,
       based on predicted next week values. Set this combination to the roster. 
-      This means finding 2C, 2L, and 2R that do not overlap. 
+      This means filling every slot of the roster template (by default 2C, 
+      2L, 2R, 4D and 2G) with players that do not overlap. 
       
       @param: none
       @return: none
     '''    
     
-    # FORWARDS:
     # Method:
-    #   Find all possible combinations
-    #   Check if combination produces a maximum predicted sum
-    
-    RW = self.get_players_by_position('R')
-    LW = self.get_players_by_position('L')
-    C = self.get_players_by_position('C')
-    
-    max_fwd_sum = 0
-    combo_sum = 0
-    max_fwd_lineup = {'C': [], 'R': [], 'L': []}
-    
-    for Rpair in combinations(RW, 2):
-        for Lpair in combinations(LW, 2):
-            for Cpair in combinations(C, 2):
-                
-                concat_list = list(Rpair+Lpair+Cpair)
-                concat_list_names = []
-                for player in concat_list: concat_list_names.append(player.get_name())
-                
-                # If no elements are repeated, then the list is good 
-                if (len(np.unique(concat_list_names)) == len(concat_list_names)):
-                    
-                    # At this point, we know we have a unique combination
-                    # of 2C, 2LW, and 2RW.
-                    # Calculate predicted sum and store if max.
-                    combo_sum = self.predict_team_next_points(sub_list=concat_list)
-                    
-                    if combo_sum > max_fwd_sum:
-                        max_fwd_sum = combo_sum
-                        max_fwd_lineup['C'] = Cpair
-                        max_fwd_lineup['R'] = Rpair
-                        max_fwd_lineup['L'] = Lpair
-    
-    # Set the remaining maximum combo to the Team object's starting roster            
-    self.starting_roster['C'] = max_fwd_lineup['C']
-    self.starting_roster['R'] = max_fwd_lineup['R']
-    self.starting_roster['L'] = max_fwd_lineup['L']
+    #   Treat every roster slot as one row of an assignment problem and
+    #   every player as a column that can fill the slots of its positions.
+    #   The max-weight assignment is the optimal lineup, and players with
+    #   two positions are only ever used once. The eligibility matrix is
+    #   kept with the Team, so flex slots cost nothing extra.
+    rows = self._get_rows(self.player_list)
+    weights = self.table.get_column('predicted', 'pts')[rows]
+    assignment = solve_assignment(weights, self._eligible)
+    self.starting_roster = self._make_roster(assignment)
+    self._roster_is_optimal = True
+
+
+  def get_top_starting_rosters(self, k=10):
+    '''
+      Find the k best starting rosters with different sets of players, for 
+      when there are close calls between players. The first one is the 
+      roster set by set_optimal_starting_roster. See lineupSolver.py for 
+      the pruned search used.
+      
+      @param: k, int number of rosters
+      @return: list of up to k (predicted points, roster dict) tuples, in 
+               descending order of predicted points
+    '''
+    rows = self._get_rows(self.player_list)
+    weights = self.table.get_column('predicted', 'pts')[rows]
+    lineups = top_k_lineups(weights, self.table.pos_mask[rows], self.template, k)
     
+    return [(points, self._make_roster(assignment)) for points, assignment in lineups]
+
+
+  def _make_roster(self, assignment, slots=None):
+    '''
+      Turn a solver assignment into a starting roster dict, with each 
+      position in descending order of predicted points.
+      
+      @param: assignment, index into player_list for each slot
+              slots, the RosterTemplate or list of slot names solved 
+                     (default the Team's template)
+      @return: dict of slot name -> list of Player objects
+    '''
+    slots = self.template if slots is None else slots
+    roster = {name: [] for name in RosterTemplate.from_slots(slots).names}
+    for slot, index in zip(slots, assignment):
+        if index >= 0:
+            roster[slot].append(self.player_list[index])
     
-    # DEFENSE: 
-    # Just sort by descending points and take top 4
-    defense = self.get_players_by_position('D')
-    defense.sort(key=lambda x: x.get_prediction(), reverse=True)
-    self.starting_roster['D'] = defense[0:4]
+    for position in roster.keys():
+        by_row = {p.row: p for p in roster[position]}
+        order = self.table.sort_by('predicted', 'pts', list(by_row.keys()))
+        roster[position] = [by_row[row] for row in order]
     
-    #GOALIES:
-    # Just sort by descending points and take top 2
-    goalies = self.get_players_by_position('G')
-    goalies.sort(key=lambda x: x.get_prediction(), reverse=True)
-    self.starting_roster['G'] = goalies[0:2]
+    return roster
+
+
 
+  def _get_rows(self, players):
+    '''
+      Table row indices of a list of Players, so team-wide calculations can
+      be vectorized over the table.
+      
+      @param: list of Player objects
+      @return: numpy int array of rows, or None if any Player is not a view 
+               of this Team's table
+    '''
+    if players is self.player_list:
+        return self._rows
+    if any(p.table is not self.table for p in players):
+        return None
+    return np.array([p.row for p in players], dtype=int)
 
 
+  @timed('set_random_starting_roster')
   def set_random_starting_roster(self):
     '''
-      Determine the first legal combination of 2R, 2C, 2L, 4D and 2G. 
-      Set this to the starting roster. 
+      Determine a legal starting roster, filling as many slots of the roster
+      template as possible, with no regard to points. Players earlier in the
+      player list are preferred. Set this to the starting roster. 
       
       @param: none
       @return: none
     '''
-    # DEFENSE - take first 4
-    defense = self.get_players_by_position('D')
-    self.starting_roster['D'] = defense[0:4]
-    
-    # GOALIES - take first 2
-    goalies = self.get_players_by_position('G')
-    self.starting_roster['G'] = goalies[0:2]
+    self._roster_is_optimal = False
     
-    # FOR FORWARDS 
-    # Get all possible players
-    RW = self.get_players_by_position('R')
-    LW = self.get_players_by_position('L')
-    C = self.get_players_by_position('C')
-
-    for Rpair in combinations(RW, 2):
-        for Lpair in combinations(LW, 2):
-            for Cpair in combinations(C, 2):
-                
-                concat_list = list(Rpair+Lpair+Cpair)
-                concat_list_names = []
-                for player in concat_list: concat_list_names.append(player.get_name())
-                
-                # If no elements are repeated, then the list is good 
-                if (len(np.unique(concat_list_names)) == len(concat_list_names)):
-    
-                        # SET THESE FORWARDS TO THE ROSTER
-                        self.starting_roster['R'] = Rpair
-                        self.starting_roster['L'] = Lpair
-                        self.starting_roster['C'] = Cpair
-                        
-                        #exit because we just need any working combo
-                        return 
+    # The same assignment as the optimal roster, over the same eligibility 
+    # matrix, with the list order as the only preference
+    order = -np.arange(len(self.player_list), dtype=float)
+    assignment = solve_assignment(order, self._eligible)
+    self.starting_roster = self._make_roster(assignment)
         
     
 
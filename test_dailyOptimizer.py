@@ -0,0 +1,36 @@
+'''
+Tests of dailyOptimizer.py: the schedules of a league's week.
+'''
+
+import os
+import shutil
+import pytest
+from dailyOptimizer import optimize_league_week, optimize_week, spread_schedule
+from teamBuilder import Team
+
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FantasyTeamPoints.xlsx')
+
+
+@pytest.fixture
+def teams(tmp_path):
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    return {'A': Team(path, 'Dec03Data'), 'B': Team(path, 'Nov26Data')}
+
+
+def test_per_team_and_shared_schedules(teams):
+    schedules = {name: spread_schedule(team) for name, team in teams.items()}
+    plans = optimize_league_week(teams, schedules)
+    for name, team in teams.items():
+        assert plans[name].get_week_points() == optimize_week(team, schedules[name]).get_week_points()
+
+    shared = {p.get_name(): [0, 2, 4] for team in teams.values() for p in team.player_list}
+    plans = optimize_league_week(teams, shared)
+    for name, team in teams.items():
+        assert plans[name].get_week_points() == optimize_week(team, shared).get_week_points()
+
+
+def test_missing_team_schedule_raises(teams):
+    with pytest.raises(KeyError):
+        optimize_league_week(teams, {'A': spread_schedule(teams['A'])})
@@ -0,0 +1,56 @@
+'''
+Tests of database.py: loading a week or a season with more than one roster.
+'''
+
+import os
+import shutil
+import numpy as np
+import pytest
+from database import FantasyDatabase
+from sheetCache import read_sheet
+
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FantasyTeamPoints.xlsx')
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    return path
+
+
+def renamed(columns, prefix):
+    columns = {column: np.array(values) for column, values in columns.items()}
+    columns['name'] = np.array([prefix + str(name) for name in columns['name']], dtype=object)
+    return columns
+
+
+def test_same_player_on_two_rosters_needs_a_roster(workbook):
+    db = FantasyDatabase(':memory:')
+    db.insert_workbook(workbook, roster='A')
+    db.insert_sheet('Dec03Data', read_sheet(workbook, 'Dec03Data'), roster='B')
+
+    with pytest.raises(AssertionError):
+        db.to_season_store()
+    with pytest.raises(AssertionError):
+        db.get_team('Dec03Data')
+
+    store = db.to_season_store('A')
+    sheet = read_sheet(workbook, 'Dec03Data')
+    assert list(store.get_columns('Dec03Data')['name']) == [str(x) for x in sheet['name']]
+    assert len(db.get_team('Dec03Data', 'B').player_list) == len(sheet['name'])
+
+
+def test_disjoint_rosters_load_together(workbook):
+    db = FantasyDatabase(':memory:')
+    sheet = read_sheet(workbook, 'Dec03Data')
+    db.insert_sheet('Dec03Data', sheet, roster='A')
+    db.insert_sheet('Dec03Data', renamed(sheet, 'B '), roster='B')
+
+    n = len(sheet['name'])
+    store = db.to_season_store()
+    columns = store.get_columns('Dec03Data')
+    assert len(columns['name']) == 2 * n
+    assert len(set(columns['name'])) == 2 * n
+    assert len(db.get_team('Dec03Data').player_list) == 2 * n
@@ -0,0 +1,67 @@
+'''
+Tests of freeAgents.py: every add/drop gain against re-solving the lineup of
+the roster after the move.
+'''
+
+import os
+import shutil
+import numpy as np
+import pytest
+from freeAgents import evaluate_free_agents
+from lineupSolver import RosterTemplate, solve_lineup
+from playerTable import PlayerTable
+from teamBuilder import Team
+
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FantasyTeamPoints.xlsx')
+
+
+@pytest.fixture
+def team(tmp_path):
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    return Team(path, 'Dec03Data')
+
+
+def random_pool(n, seed):
+    rng = np.random.default_rng(seed)
+    first = rng.choice(list('CLRDG'), n)
+    second = np.where((rng.random(n) < 0.3) & np.isin(first, list('CLR')),
+                      rng.choice(list('CLR'), n), '')
+    return PlayerTable({'name': ['fa{}'.format(i) for i in range(n)],
+                        'position_1': first, 'position_2': second, 'team': ['X'] * n,
+                        'games_7': rng.integers(0, 5, n), 'points_7': rng.random(n) * 20,
+                        'games_total': rng.integers(5, 30, n),
+                        'points_total': rng.random(n) * 100,
+                        'games_this_week': rng.integers(0, 5, n)})
+
+
+def solve(weights, masks, template):
+    assignment = solve_lineup(weights, masks, template)
+    return int((assignment >= 0).sum()), weights[assignment[assignment >= 0]].sum()
+
+
+@pytest.mark.parametrize('slots', [None, RosterTemplate([('C', 1), ('F', 2), ('D', 3),
+                                                         ('UTIL', 1), ('G', 1)])])
+def test_gains_match_full_solve(team, slots):
+    template = RosterTemplate.from_slots(team.template if slots is None else slots)
+    pool = random_pool(40, seed=1)
+    ranking = evaluate_free_agents(team, pool, top=None, slots=slots)
+    assert len(ranking) == len(pool) * len(team.player_list)
+
+    rows = team._get_rows(team.player_list)
+    weights = np.nan_to_num(team.table.get_column('predicted', 'pts')[rows])
+    masks = team.table.pos_mask[rows]
+    base_filled, base_points = solve(weights, masks, template)
+    names = [p.get_name() for p in team.player_list]
+    agents = {name: i for i, name in enumerate(pool.names)}
+    agent_points = pool.get_column('predicted', 'pts')
+
+    for gain, agent, dropped in ranking:
+        d, a = names.index(dropped), agents[agent]
+        filled, points = solve(np.append(np.delete(weights, d), agent_points[a]),
+                               np.append(np.delete(masks, d), pool.pos_mask[a]), template)
+        expected = -np.inf if filled < base_filled else round(points - base_points, 2)
+        assert gain == expected or abs(gain - expected) < 0.011
+    gains = [gain for gain, _, _ in ranking]
+    assert gains == sorted(gains, reverse=True)
@@ -0,0 +1,91 @@
+'''
+Tests of lineupSolver.py: the assignment solver and the K best lineups
+against brute force on small random pools.
+'''
+
+import itertools
+import numpy as np
+from lineupSolver import (POSITION_BITS, RosterTemplate, eligibility_matrix, solve_assignment,
+                          solve_lineup, top_k_lineups)
+
+
+def brute_force(weights, eligible):
+    '''
+        Best (filled slots, total weight) over every legal assignment.
+    '''
+    n_slots, n_players = eligible.shape
+    best = (0, 0.0)
+    for assignment in itertools.product(range(-1, n_players), repeat=n_slots):
+        used = [p for p in assignment if p >= 0]
+        if len(set(used)) != len(used):
+            continue
+        if any(p >= 0 and not eligible[s, p] for s, p in enumerate(assignment)):
+            continue
+        best = max(best, (len(used), round(sum(weights[p] for p in used), 6)))
+    return best
+
+
+def check_assignment(weights, eligible, assignment):
+    filled = assignment[assignment >= 0]
+    assert len(set(filled)) == len(filled), "a player is in two slots"
+    assert all(eligible[s, p] for s, p in enumerate(assignment) if p >= 0)
+    return (len(filled), round(sum(weights[p] for p in filled), 6))
+
+
+def test_solve_assignment_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for trial in range(300):
+        n_slots, n_players = rng.integers(1, 5), rng.integers(1, 7)
+        weights = rng.integers(-3, 10, n_players).astype(float)
+        eligible = rng.random((n_slots, n_players)) < 0.5
+        assignment = solve_assignment(weights, eligible)
+        assert check_assignment(weights, eligible, assignment) == brute_force(weights, eligible)
+
+
+def test_solve_lineup_with_flex_slots_matches_brute_force():
+    template = RosterTemplate([('C', 1), ('L', 1), ('F', 1), ('D', 1), ('UTIL', 1)])
+    bits = list(POSITION_BITS.values())
+    rng = np.random.default_rng(1)
+    for trial in range(100):
+        n_players = rng.integers(3, 8)
+        weights = np.round(rng.random(n_players) * 20, 1)
+        masks = np.array([bits[i] | (bits[j] if rng.random() < 0.3 else 0)
+                          for i, j in rng.integers(0, 4, (n_players, 2))])
+        eligible = template.eligibility(masks)
+        assignment = solve_lineup(weights, masks, template)
+        assert check_assignment(weights, eligible, assignment) == brute_force(weights, eligible)
+
+
+def test_top_k_lineups_match_brute_force():
+    slots = ['C', 'C', 'L', 'R', 'D', 'D']
+    rng = np.random.default_rng(3)
+    for trial in range(60):
+        n_players = rng.integers(5, 11)
+        masks = rng.choice([1, 2, 4, 1 | 2, 1 | 4, 2 | 4, 8], n_players)
+        weights = np.round(rng.random(n_players) * 20, 1)
+        k = int(rng.integers(1, 8))
+        eligible = eligibility_matrix(slots, masks)
+
+        # Every set of players that fills as many slots as possible
+        filled = int((solve_assignment(weights, eligible) >= 0).sum())
+        totals = []
+        for players in itertools.combinations(range(n_players), filled):
+            players = list(players)
+            if (solve_assignment(np.zeros(filled), eligible[:, players]) >= 0).sum() == filled:
+                totals.append(round(weights[players].sum(), 2))
+        totals.sort(reverse=True)
+
+        lineups = top_k_lineups(weights, masks, slots, k)
+        assert [total for total, _ in lineups] == totals[:k]
+        assert len({frozenset(a[a >= 0]) for _, a in lineups}) == len(lineups)
+        for total, assignment in lineups:
+            players = assignment[assignment >= 0]
+            assert len(players) == filled
+            assert all(eligible[s, p] for s, p in enumerate(assignment) if p >= 0)
+            assert abs(weights[players].sum() - total) < 1e-6
+
+
+def test_empty_pool():
+    assert list(solve_lineup([], [], ['C', 'D'])) == [-1, -1]
+    [(total, assignment)] = top_k_lineups([], [], ['C', 'D'], 3)
+    assert total == 0 and list(assignment) == [-1, -1]
@@ -0,0 +1,33 @@
+'''
+Tests of seasonStore.py: weeks go in and come back out in sheet order.
+'''
+
+import numpy as np
+import pytest
+from seasonStore import SeasonStore
+
+
+def week(names):
+    n = len(names)
+    return {'name': names, 'position_1': ['C'] * n, 'position_2': [''] * n,
+            'team': ['TOR'] * n, 'points_7': np.arange(n, dtype=float),
+            'games_7': np.full(n, 3), 'points_total': np.arange(n, dtype=float),
+            'games_total': np.full(n, 3), 'games_this_week': np.full(n, 4)}
+
+
+def test_weeks_come_back_in_sheet_order():
+    store = SeasonStore()
+    store.append_week('Week1', week(['A', 'B', 'C']))
+    store.append_week('Week2', week(['C', 'D', 'A']))
+    assert list(store.get_columns('Week1')['name']) == ['A', 'B', 'C']
+    assert list(store.get_columns('Week2')['name']) == ['C', 'D', 'A']
+    assert list(store.get_columns('Week2')['points_7']) == [0.0, 1.0, 2.0]
+
+
+def test_duplicate_player_in_a_week_is_rejected():
+    store = SeasonStore()
+    store.append_week('Week1', week(['A', 'B']))
+    with pytest.raises(AssertionError):
+        store.append_week('Week2', week(['A', 'B', 'A']))
+    assert store.weeks == ['Week1']
+    assert store.names == ['A', 'B']
@@ -0,0 +1,45 @@
+'''
+Tests of sheetCache.py: a warm cache is read without pandas.
+'''
+
+import os
+import sys
+import shutil
+import subprocess
+import numpy as np
+from sheetCache import read_sheet, warm_cache
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK = os.path.join(HERE, 'FantasyTeamPoints.xlsx')
+
+# Warm the cache in a fresh interpreter, and report whether pandas was needed
+WARM = ('import sys; from sheetCache import warm_cache; '
+        'print(len(warm_cache(sys.argv[1])), "pandas" in sys.modules)')
+
+
+def warm_in_subprocess(path):
+    output = subprocess.run([sys.executable, '-c', WARM, path], cwd=HERE, check=True,
+                            capture_output=True, text=True).stdout.split()
+    return int(output[0]), output[1] == 'True'
+
+
+def test_warm_cache_skips_pandas_once_cached(tmp_path):
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    sheets = warm_cache(path)
+
+    assert warm_in_subprocess(path) == (len(sheets), False)
+    os.utime(path) # Same contents, new mtime
+    assert warm_in_subprocess(path) == (len(sheets), False)
+
+
+def test_cached_sheet_matches_workbook(tmp_path):
+    import pandas as pd
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    for sheet in warm_cache(path):
+        df = pd.read_excel(path, sheet_name=sheet)
+        columns = read_sheet(path, sheet)
+        assert list(columns) == [str(c) for c in df.columns]
+        assert np.array_equal(columns['points_7'], df['points_7'].to_numpy())
@@ -0,0 +1,79 @@
+'''
+Tests of teamBuilder.py: the optimal starting roster of the sample workbook,
+and incremental updates of it against a full re-solve.
+'''
+
+import os
+import shutil
+import numpy as np
+import pytest
+from playerTable import PlayerTable
+from teamBuilder import Team
+
+
+WORKBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FantasyTeamPoints.xlsx')
+
+
+@pytest.fixture
+def team(tmp_path):
+    path = str(tmp_path / 'FantasyTeamPoints.xlsx')
+    shutil.copy(WORKBOOK, path)
+    return Team(path, 'Dec03Data')
+
+
+def test_dec03_optimal_roster(team):
+    team.set_optimal_starting_roster()
+    assert team.predict_starting_roster_next_points() == 318.94
+
+    starters = [p for players in team.starting_roster.values() for p in players]
+    assert len(starters) == len(set(starters)) == len(team.template)
+    for slot, players in team.starting_roster.items():
+        assert len(players) == team.template.counts[slot]
+        for p in players:
+            assert any(position in team.template.positions[slot]
+                       for position in p.get_position() if position)
+
+
+def random_record(rng, i):
+    first = str(rng.choice(list('CLRDGCLR')))
+    second = str(rng.choice(['', '', '', 'C', 'L', 'R']))
+    if first in 'DG' or second == first:
+        second = ''
+    return {'name': 'n{}'.format(i), 'position_1': first, 'position_2': second, 'team': 'X',
+            'games_7': int(rng.integers(0, 5)), 'points_7': float(rng.random() * 40),
+            'games_total': int(rng.integers(5, 30)), 'points_total': float(rng.random() * 300),
+            'games_this_week': int(rng.integers(0, 5))}
+
+
+def full_solve(team):
+    fresh = Team(table=team.table)
+    fresh.player_list = list(team.player_list)
+    fresh._build_indexes()
+    fresh.set_optimal_starting_roster()
+    return fresh
+
+
+def test_incremental_updates_match_full_solve():
+    rng = np.random.default_rng(5)
+    for trial in range(40):
+        team = Team(table=PlayerTable.from_records([random_record(rng, i) for i in range(30)]))
+        team.set_optimal_starting_roster()
+        next_id = 100
+        for step in range(15):
+            names = [p.get_name() for p in team.player_list]
+            change = rng.integers(0, 4)
+            if change == 0:
+                team.update_player_games(str(rng.choice(names)), int(rng.integers(0, 5)))
+            elif change == 1:
+                team.update_player_prediction(str(rng.choice(names)), float(rng.random() * 60))
+            elif change == 2:
+                team.add_player(random_record(rng, next_id))
+                next_id += 1
+            else:
+                team.remove_player(str(rng.choice(names)))
+
+            fresh = full_solve(team)
+            assert abs(team.predict_starting_roster_next_points() -
+                       fresh.predict_starting_roster_next_points()) < 1e-6
+            assert sum(map(len, team.starting_roster.values())) == \
+                   sum(map(len, fresh.starting_roster.values()))